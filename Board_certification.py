@@ -1,41 +1,21 @@
-import openpyxl
+from input_table import as_input_table
 
-def extract_board_certification(input_file):
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    try:
-        cert_idx = input_header_row.index('Board Certification')
-    except ValueError:
+def extract_board_certification(input_table):
+    input_table = as_input_table(input_table)
+    if 'Board Certification' not in input_table:
         raise ValueError("'Board Certification' column not found in input file.")
-    cert_list = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        cert_list.append(row[cert_idx])
-    return cert_list
+    return list(input_table['Board Certification'])
 
-def extract_board_subspecialty(input_file):
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    try:
-        subspecialty_idx = input_header_row.index('Board Subspecialty')
-    except ValueError:
+def extract_board_subspecialty(input_table):
+    input_table = as_input_table(input_table)
+    if 'Board Subspecialty' not in input_table:
         raise ValueError("'Board Subspecialty' column not found in input file.")
-    subspecialty_list = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        subspecialty_list.append(row[subspecialty_idx])
-    return subspecialty_list
+    return list(input_table['Board Subspecialty'])
 
-def set_board_certification_dropdown(output_file: str):
-    import openpyxl
-    from openpyxl.worksheet.datavalidation import DataValidation
+def set_board_certification_dropdown(session):
+    from validation_registry import add_column_dropdown
     from openpyxl.utils import get_column_letter
-    wb = openpyxl.load_workbook(output_file)
-    ws = wb['Provider']
+    ws = session['Provider']
     header_row = [cell.value for cell in ws[1]]
     max_row = ws.max_row
     # Build the list of ranges to clear
@@ -65,11 +45,7 @@ def set_board_certification_dropdown(output_file: str):
             col_idx = header_row.index(col_name) + 1  # 1-based index
         except ValueError:
             continue  # Skip if the column is not found
-        dv = DataValidation(type="list", formula1='=ValidationAndReference!$N$2:$N$299', allow_blank=True)
-        col_letter = get_column_letter(col_idx)
-        dv_range = f"{col_letter}2:{col_letter}{max_row}"
-        dv.add(dv_range)
-        ws.add_data_validation(dv)
+        add_column_dropdown(ws, col_idx, '=ValidationAndReference!$N$2:$N$299', last_row=max_row)
     # Apply new Sub Board Certification dropdowns
     for cert_num in range(1, 6):
         col_name = f'Sub Board Certification {cert_num}'
@@ -77,9 +53,4 @@ def set_board_certification_dropdown(output_file: str):
             col_idx = header_row.index(col_name) + 1  # 1-based index
         except ValueError:
             continue  # Skip if the column is not found
-        dv = DataValidation(type="list", formula1='=ValidationAndReference!$AB$2:$AB$156', allow_blank=True)
-        col_letter = get_column_letter(col_idx)
-        dv_range = f"{col_letter}2:{col_letter}{max_row}"
-        dv.add(dv_range)
-        ws.add_data_validation(dv)
-    wb.save(output_file) 
\ No newline at end of file
+        add_column_dropdown(ws, col_idx, '=ValidationAndReference!$AB$2:$AB$156', last_row=max_row)
\ No newline at end of file
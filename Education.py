@@ -1,23 +1,14 @@
-import openpyxl
+from input_table import as_input_table
 
-def extract_education(input_file):
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    try:
-        education_idx = input_header_row.index('Highest Level of Education')
-    except ValueError:
+def extract_education(input_table):
+    input_table = as_input_table(input_table)
+    if 'Highest Level of Education' not in input_table:
         raise ValueError("'Highest Level of Education' column not found in input file.")
-    try:
-        school_idx = input_header_row.index('School')
-    except ValueError:
-        school_idx = None
+    education_values = input_table['Highest Level of Education']
+    school_values = input_table.get('School')
     education_list = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        education_val = row[education_idx] if education_idx < len(row) else None
-        school_val = row[school_idx] if school_idx is not None and school_idx < len(row) else None
+    for idx, education_val in enumerate(education_values):
+        school_val = school_values[idx] if school_values is not None else None
         if education_val is not None and str(education_val).strip() != "":
             if school_val is not None and str(school_val).strip() != "":
                 combined = f"{education_val}, {school_val}"
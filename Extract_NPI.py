@@ -1,25 +1,16 @@
-import openpyxl
 import os
 from openpyxl import Workbook
+from input_table import as_input_table
 
-def create_npi_specialty_excel(input_excel_path, output_excel_path):
-    # Load the workbook and select the first sheet
-    wb = openpyxl.load_workbook(input_excel_path, data_only=True)
-    sheet = wb.active
-
-    # Find the column index for 'NPI'
-    header = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-    try:
-        npi_col_idx = header.index('NPI')
-    except ValueError:
+def extract_npi_values(input_excel_path):
+    """Returns the non-empty values of the 'NPI' column of the input (a path or an input table)."""
+    input_table = as_input_table(input_excel_path)
+    if 'NPI' not in input_table:
         raise Exception("'NPI' column not found in the Excel file.")
+    return [npi_value for npi_value in input_table['NPI'] if npi_value is not None]
 
-    # Extract all values from the 'NPI' column (skip header)
-    npi_list = []
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        npi_value = row[npi_col_idx]
-        if npi_value is not None:
-            npi_list.append(npi_value)
+def create_npi_specialty_excel(input_excel_path, output_excel_path):
+    npi_list = extract_npi_values(input_excel_path)
 
     # Write the NPI list to a new Excel file
     wb_npi = Workbook()
@@ -36,3 +27,4 @@ def create_npi_specialty_excel(input_excel_path, output_excel_path):
     except Exception as e:
         print(f"Failed to save file at {output_excel_path}. Error: {e}")
         print(f"Current working directory: {os.getcwd()}")
+    return npi_list
@@ -1,17 +1,12 @@
-import openpyxl
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
+from validation_registry import add_column_dropdown
+from input_table import as_input_table, input_row_count
 
-def extract_name_gender(input_file):
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    input_indices = {header: idx for idx, header in enumerate(input_header_row) if header in ['First Name', 'Last Name', 'Gender']}
+def extract_name_gender(input_table):
+    input_table = as_input_table(input_table)
+    columns = {col: input_table.get(col) for col in ['First Name', 'Last Name', 'Gender']}
     extracted_rows = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        extracted = {col: row[input_indices[col]] if col in input_indices else None for col in ['First Name', 'Last Name', 'Gender']}
+    for idx in range(input_row_count(input_table)):
+        extracted = {col: values[idx] if values is not None else None for col, values in columns.items()}
         # Map 'Prefer not to say' to 'Not Applicable' for Gender
         if extracted['Gender'] == 'Prefer not to say':
             extracted['Gender'] = 'Not Applicable'
@@ -29,8 +24,4 @@ def add_gender_dropdown(ws, header_row=1):
         gender_idx = header.index('Gender')
     except ValueError:
         return  # Gender column not found
-    gender_col_letter = get_column_letter(gender_idx+1)
-    dv_gender = DataValidation(type="list", formula1='"Male,Female,NonBinary,Not Applicable"', allow_blank=True)
-    dv_gender_range = f"{gender_col_letter}{header_row+1}:{gender_col_letter}{ws.max_row}"
-    dv_gender.add(dv_gender_range)
-    ws.add_data_validation(dv_gender)
+    add_column_dropdown(ws, gender_idx+1, '"Male,Female,NonBinary,Not Applicable"', first_row=header_row+1)
@@ -1,6 +1,6 @@
-import openpyxl
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 import re
+from input_table import as_input_table
 
 def map_ages_to_patients_accepted(ages_treated: Optional[str]) -> str:
     if not ages_treated or not isinstance(ages_treated, str) or ages_treated.strip() == '':
@@ -35,43 +35,24 @@ def map_ages_to_patients_accepted(ages_treated: Optional[str]) -> str:
     else:
         return 'Adult'
 
-def extract_patients_accepted(input_file: str) -> List[Optional[str]]:
+def extract_patients_accepted(input_table: Union[str, Dict[str, list]]) -> List[Optional[str]]:
     """
-    Extracts the 'Ages Treated' column from the input Excel file and returns a list of 'Adult', 'Pediatric', or 'Both'.
+    Extracts the 'Ages Treated' column from the input table (or Excel file) and returns a list of 'Adult', 'Pediatric', or 'Both'.
     """
-    wb = openpyxl.load_workbook(input_file)
-    ws = wb.active
-    if ws is None:
-        raise Exception("No active worksheet found in the input file.")
-    header = [str(cell.value) if cell.value is not None else '' for cell in ws[1]]
-    try:
-        ages_treated_idx = header.index('Ages Treated')
-    except ValueError:
+    input_table = as_input_table(input_table)
+    if 'Ages Treated' not in input_table:
         raise Exception("'Ages Treated' column not found in input file.")
     patients_accepted = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if row is not None and len(row) > ages_treated_idx:
-            ages_val = row[ages_treated_idx]
-            patients_accepted.append(map_ages_to_patients_accepted(str(ages_val)) if ages_val is not None else 'Adult')
-        else:
-            patients_accepted.append('Adult')
+    for ages_val in input_table['Ages Treated']:
+        patients_accepted.append(map_ages_to_patients_accepted(str(ages_val)) if ages_val is not None else 'Adult')
     return patients_accepted
 
-def set_patients_accepted_dropdown(output_file: str):
-    import openpyxl
-    from openpyxl.worksheet.datavalidation import DataValidation
-    from openpyxl.utils import get_column_letter
-    wb = openpyxl.load_workbook(output_file)
-    ws = wb['Provider']
+def set_patients_accepted_dropdown(session):
+    from validation_registry import add_column_dropdown
+    ws = session['Provider']
     header_row = [cell.value for cell in ws[1]]
     try:
         col_idx = header_row.index('Patients Accepted') + 1  # 1-based index
     except ValueError:
         raise Exception('Patients Accepted column not found in output file.')
-    dv = DataValidation(type="list", formula1='"Adult,Pediatric,Both"', allow_blank=True)
-    max_row = ws.max_row
-    col_letter = get_column_letter(col_idx)
-    dv_range = f"{col_letter}2:{col_letter}{max_row}"
-    dv.add(dv_range)
-    ws.add_data_validation(dv)
-    wb.save(output_file)
+    add_column_dropdown(ws, col_idx, '"Adult,Pediatric,Both"')
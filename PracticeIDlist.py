@@ -1,25 +1,20 @@
-import openpyxl
 from openpyxl import Workbook
 import os
+from input_table import as_input_table
 
-def extract_unique_practice_ids(input_excel_path, output_excel_path):
-    # Load the workbook and select the first sheet
-    wb = openpyxl.load_workbook(input_excel_path, data_only=True)
-    sheet = wb.active
-
-    # Find the column index for 'Practice ID'
-    header = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-    try:
-        practice_id_col_idx = header.index('Practice ID')
-    except ValueError:
+def read_unique_practice_ids(input_excel_path):
+    """The distinct non-empty values of the input's 'Practice ID' column (a path or an input table), as a set."""
+    input_table = as_input_table(input_excel_path)
+    if 'Practice ID' not in input_table:
         raise Exception("'Practice ID' column not found in the Excel file.")
+    return {practice_id_value for practice_id_value in input_table['Practice ID'] if practice_id_value is not None}
 
-    # Extract all unique values from the 'Practice ID' column (skip header)
-    practice_id_set = set()
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        practice_id_value = row[practice_id_col_idx]
-        if practice_id_value is not None:
-            practice_id_set.add(practice_id_value)
+def numeric_practice_ids(practice_id_set):
+    """The Practice IDs that are numbers (text values are ignored), sorted."""
+    return sorted(pid for pid in practice_id_set if isinstance(pid, (int, float)))
+
+def extract_unique_practice_ids(input_excel_path, output_excel_path):
+    practice_id_set = read_unique_practice_ids(input_excel_path)
 
     # Write the unique Practice IDs to a new Excel file
     wb_out = Workbook()
@@ -28,8 +23,7 @@ def extract_unique_practice_ids(input_excel_path, output_excel_path):
     # Write header
     sheet_out['A1'] = 'Practice ID'
     # Write Practice ID values (ignore text types, only keep int/float)
-    numeric_ids = [pid for pid in practice_id_set if isinstance(pid, (int, float))]
-    for idx, pid in enumerate(sorted(numeric_ids), start=2):
+    for idx, pid in enumerate(numeric_practice_ids(practice_id_set), start=2):
         sheet_out[f'A{idx}'] = pid
     try:
         wb_out.save(output_excel_path)
@@ -1,10 +1,12 @@
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+import run_manifest
 
 # Input/output filenames
 INPUT_FILE = 'Excel Files/Mergedoutput.xlsx'
 OUTPUT_FILE = 'Excel Files/Report.xlsx'   # changed path here
+MANIFEST_FILE = 'Excel Files/' + run_manifest.MANIFEST_FILE_NAME
 SHEET_NAME = 'Provider'
 
 # Color mappings (normalized RGB hex without #, as openpyxl stores "RRGGBB")
@@ -54,6 +56,12 @@ CATEGORY_DESCRIPTIONS = [
 ]
 
 def main():
+    # Report runs after the pipeline, so its timing is appended to that run's manifest
+    with run_manifest.recording(MANIFEST_FILE, append=True):
+        with run_manifest.stage('report'):
+            build_report()
+
+def build_report():
     wb = openpyxl.load_workbook(INPUT_FILE)
     ws = wb[SHEET_NAME]
     header = [cell.value for cell in ws[1]]
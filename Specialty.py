@@ -1,21 +1,11 @@
-import openpyxl
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
+from validation_registry import add_column_dropdown
+from input_table import as_input_table
 
-def extract_specialty(input_file):
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    try:
-        specialty_idx = input_header_row.index('Board Subspecialty')
-    except ValueError:
+def extract_specialty(input_table):
+    input_table = as_input_table(input_table)
+    if 'Board Subspecialty' not in input_table:
         raise ValueError("'Board Subspecialty' column not found in input file.")
-    specialty_list = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        specialty_list.append(row[specialty_idx])
-    return specialty_list
+    return list(input_table['Board Subspecialty'])
 
 
 def add_specialty_dropdowns(ws, ws_valref, header_row=1):
@@ -46,8 +36,4 @@ def add_specialty_dropdowns(ws, ws_valref, header_row=1):
             specialty_cols.append(idx)
     # Add dropdowns to each column
     for idx in specialty_cols:
-        col_letter = get_column_letter(idx+1)
-        dv = DataValidation(type="list", formula1='"' + ','.join(specialty_list) + '"', allow_blank=True)
-        dv_range = f"{col_letter}{header_row+1}:{col_letter}{ws.max_row}"
-        dv.add(dv_range)
-        ws.add_data_validation(dv)
+        add_column_dropdown(ws, idx+1, '"' + ','.join(specialty_list) + '"', first_row=header_row+1)
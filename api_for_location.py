@@ -1,152 +1,328 @@
-from PracticeIDlist import extract_unique_practice_ids
+from PracticeIDlist import numeric_practice_ids, read_unique_practice_ids
+import argparse
+import json
 import os
 import openpyxl
-import requests
 import sys
 import time
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font
+from openpyxl.utils import get_column_letter
+from input_table import load_input_table, table_frame
+import provider_reference
+import run_manifest
+from provider_reference_cache import PROVIDER_REFERENCE_CACHE_FILE, ProviderReferenceCache
 
-# Step 1: Ensure Practice-Location.xlsx is created/updated
 input_path = os.path.join("Excel Files", "Input.xlsx")
 output_path = os.path.join("Excel Files", "Practice-Location.xlsx")
-extract_unique_practice_ids(input_path, output_path)
-
-# Step 2: Read unique Practice IDs from Practice-Location.xlsx
-wb = openpyxl.load_workbook(output_path, data_only=True)
-sheet = wb.active
-practice_ids = []
-for row in sheet.iter_rows(min_row=2, values_only=True):
-    pid = row[0]
-    if pid is not None:
-        practice_ids.append(str(pid))
-unique_practice_ids = list(set(practice_ids))
-print(f"Number of Unique Practice IDs in the Batch: {len(unique_practice_ids)}")
-
-# Step 3: Make POST request to get cloud IDs
-url = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice/ids-by-monolith-ids~batchGet'
-headers = {
-    'accept': 'application/json',
-    'Content-Type': 'application/json'
-}
-data = {
-    "monolith_practice_ids": unique_practice_ids
-}
-print("Fetching Practice Cloud IDs...")
-response = requests.post(url, headers=headers, json=data)
-
-cloud_id_map = {}
-if response.status_code == 200:
-    result = response.json()
-    for item in result.get('practice_ids', []):
-        monolith_id = str(item.get('monolith_practice_id'))
-        cloud_id = item.get('practice_id')
-        cloud_id_map[monolith_id] = cloud_id
-else:
-    print(f"Failed to fetch cloud IDs. Status code: {response.status_code}")
-    print(response.text)
-    cloud_id_map = {}
 
-# Step 4: Write 'Practice Cloud ID' to Practice-Location.xlsx
-wb = openpyxl.load_workbook(output_path)
-sheet = wb.active
-header = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-if 'Practice Cloud ID' in header:
-    cloud_col_idx = header.index('Practice Cloud ID') + 1
-else:
-    cloud_col_idx = len(header) + 1
-    sheet.cell(row=1, column=cloud_col_idx, value='Practice Cloud ID')
-for row_idx, row in enumerate(sheet.iter_rows(min_row=2, max_row=sheet.max_row), start=2):
-    pid = str(row[0].value)
-    cloud_id = cloud_id_map.get(pid, None)
-    sheet.cell(row=row_idx, column=cloud_col_idx, value=cloud_id)
-wb.save(output_path)
-print(f"Updated {output_path} with Practice Cloud IDs.")
-
-# Step 5: For each Practice Cloud ID, get location details and append to Excel
-location_url = 'https://provider-reference-v1.east.zocdoccloud.com/provider-reference/v1/practice/location~batchGet'
-location_headers = {
-    'accept': 'application/json',
-    'Content-Type': 'application/json'
-}
+# Monolith practice IDs per ids-by-monolith-ids~batchGet request and practice cloud IDs per location~batchGet
+# request to start with; provider_reference adapts them to how the service responds, up to the maximums
+CLOUD_ID_BATCH_SIZE = 500
+MAX_CLOUD_ID_BATCH_SIZE = 1000
+LOCATION_BATCH_SIZE = 100
+MAX_LOCATION_BATCH_SIZE = 300
+
 # Define the fields to extract, with 'is_virtual' before 'address_1' and 'Location Type' after 'is_virtual'
 location_fields = [
     'is_virtual', 'Location Type', 'address_1', 'address_2', 'city', 'state', 'zip',
     'monolith_location_id', 'location_id', 'virtual_visit_type',
     'software', 'software_id', 'hide_on_profile', 'phone', 'email_addresses'
 ]
-wb = openpyxl.load_workbook(output_path)
-sheet = wb.active
-header = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-for field in location_fields:
-    if field not in header:
-        header.append(field)
-        sheet.cell(row=1, column=len(header), value=field)
-
-# Apply header styling: fill color '000AD6', font color 'FFFFFF'
-header_fill = PatternFill(start_color='000AD6', end_color='000AD6', fill_type='solid')
-header_font = Font(color='FFFFFF', bold=True)
-for col in range(1, len(header) + 1):
-    cell = sheet.cell(row=1, column=col)
-    cell.fill = header_fill
-    cell.font = header_font
-# Freeze the header row
-sheet.freeze_panes = 'A2'
-# Add autofilter to all columns
-sheet.auto_filter.ref = sheet.dimensions
-
-practice_id_to_cloud_id = {}
-for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row):
-    pid = row[0].value
-    cloud_id = row[cloud_col_idx-1].value
-    if pid and cloud_id:
-        practice_id_to_cloud_id[str(cloud_id)] = str(pid)
-cloud_ids = list(practice_id_to_cloud_id.keys())
-print(f"Number of Practice IDs to process for location details: {len(cloud_ids)}")
-processed_count = 0
-for cloud_id in cloud_ids:
-    data = {"practice_ids": [cloud_id]}
-    response = requests.post(location_url, headers=location_headers, json=data)
-    if response.status_code == 200:
-        result = response.json()
-        locations = result.get('practice_locations', [])
-        for loc in locations:
-            row_data = [practice_id_to_cloud_id[cloud_id], cloud_id]
-            # is_virtual
-            is_virtual_value = loc.get('is_virtual', None)
-            row_data.append(is_virtual_value)
-            # Location Type
-            if is_virtual_value is True or (isinstance(is_virtual_value, str) and is_virtual_value.upper() == 'TRUE'):
-                row_data.append('Virtual')
-            elif is_virtual_value is False or (isinstance(is_virtual_value, str) and is_virtual_value.upper() == 'FALSE'):
-                row_data.append('In Person')
-            else:
-                row_data.append(None)
-            # The rest of the fields
-            for field in location_fields[2:]:
-                value = loc.get(field, None)
-                if isinstance(value, list):
-                    value = ', '.join(map(str, value))
-                row_data.append(value)
-            sheet.append(row_data)
+PRACTICE_LOCATION_COLUMNS = ['Practice ID', 'Practice Cloud ID'] + location_fields
+
+def location_row(practice_id, cloud_id, loc):
+    """Practice-Location row for one location returned by location~batchGet."""
+    row_data = [practice_id, cloud_id]
+    # is_virtual
+    is_virtual_value = loc.get('is_virtual', None)
+    row_data.append(is_virtual_value)
+    # Location Type
+    if is_virtual_value is True or (isinstance(is_virtual_value, str) and is_virtual_value.upper() == 'TRUE'):
+        row_data.append('Virtual')
+    elif is_virtual_value is False or (isinstance(is_virtual_value, str) and is_virtual_value.upper() == 'FALSE'):
+        row_data.append('In Person')
     else:
-        print(f"Failed to fetch locations for Cloud ID {cloud_id}. Status code: {response.status_code}")
-        print(response.text)
-    processed_count += 1
-    sys.stdout.write(f"\rProcessed Practice IDs: {processed_count}/{len(cloud_ids)} ")
-    sys.stdout.flush()
-print()  # Move to next line after progress
-
-# Step 6: Remove rows with only Practice ID and Practice Cloud ID before saving
-rows_to_delete = []
-header = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-cloud_col_idx = header.index('Practice Cloud ID') + 1
-for row_idx, row in enumerate(sheet.iter_rows(min_row=2, max_row=sheet.max_row), start=2):
-    values = [cell.value for cell in row]
-    # Only Practice ID and Practice Cloud ID have values, rest are None or empty
-    if all((v is None or v == '') for v in values[cloud_col_idx:]):
-        rows_to_delete.append(row_idx)
-for idx in reversed(rows_to_delete):
-    sheet.delete_rows(idx)
-
-wb.save(output_path)
-print(f"Appended location details to {output_path} and cleaned up empty rows.")
+        row_data.append(None)
+    # The rest of the fields
+    for field in location_fields[2:]:
+        value = loc.get(field, None)
+        if isinstance(value, list):
+            value = ', '.join(map(str, value))
+        row_data.append(value)
+    return row_data
+
+def group_locations(cloud_ids, locations):
+    """
+    Splits the practice_locations of one batchGet response by the practice cloud ID each one belongs to.
+    Locations that don't name a practice can only be placed when the request was for a single practice.
+    Returns (by_practice, unplaced): {cloud_id: [locations]} and the number of locations left unplaced.
+    """
+    by_practice = {cloud_id: [] for cloud_id in cloud_ids}
+    unplaced = 0
+    for loc in locations:
+        cloud_id = loc.get('practice_id')
+        if cloud_id is None and len(cloud_ids) == 1:
+            cloud_id = cloud_ids[0]
+        if cloud_id is None or str(cloud_id) not in by_practice:
+            unplaced += 1
+            continue
+        by_practice[str(cloud_id)].append(loc)
+    return by_practice, unplaced
+
+def failed_requests_path(output_path):
+    """Queue of the requests that failed while building output_path, kept next to it."""
+    return os.path.splitext(output_path)[0] + ".failed.json"
+
+def describe_failure(response):
+    # A timeout/connection error that outlasted its retries, or the status of the final response
+    if isinstance(response, Exception):
+        return f"{type(response).__name__}: {response}"
+    if provider_reference.is_transient(response):
+        return f"status {response.status_code}, still failing after retries"
+    return f"status {response.status_code}"
+
+def fetch_cloud_ids(practice_ids, cache=None):
+    """
+    Looks up the cloud ID of each monolith practice ID: from cache (a ProviderReferenceCache) when it has
+    them, the rest CLOUD_ID_BATCH_SIZE per request. Returns (cloud_id_map, failed): {practice_id: cloud_id},
+    and {practice_id: reason} for failed requests.
+    """
+    cloud_id_map = {}
+    if cache is not None:
+        cached = cache.get_cloud_ids(practice_ids)
+        # Practices the service didn't know last time are cached as None and stay out of the map
+        cloud_id_map = {pid: cloud_id for pid, cloud_id in cached.items() if cloud_id}
+        practice_ids = [pid for pid in practice_ids if pid not in cached]
+    results = []
+    if practice_ids:
+        results = provider_reference.post_batched(provider_reference.CLOUD_IDS_PATH, "monolith_practice_ids",
+                                                  practice_ids, CLOUD_ID_BATCH_SIZE, MAX_CLOUD_ID_BATCH_SIZE)
+    failed = {}
+    for batch, response in results:
+        if not isinstance(response, Exception) and response.status_code == 200:
+            result = response.json()
+            fetched = dict.fromkeys(batch)
+            for item in result.get('practice_ids', []):
+                monolith_id = str(item.get('monolith_practice_id'))
+                cloud_id = item.get('practice_id')
+                cloud_id_map[monolith_id] = cloud_id
+                fetched[monolith_id] = cloud_id
+            if cache is not None:
+                cache.put_cloud_ids(fetched)
+        else:
+            # Only this batch's practices go without a cloud ID; the rest of the run carries on
+            print(f"Failed to fetch cloud IDs for {len(batch)} practices: {describe_failure(response)}")
+            if not isinstance(response, Exception):
+                print(response.text)
+            failed.update(dict.fromkeys(batch, describe_failure(response)))
+    return cloud_id_map, failed
+
+def fetch_location_rows(practice_id_to_cloud_id, cache=None):
+    """
+    Fetches the locations of the practices in practice_id_to_cloud_id ({cloud_id: practice_id}), from cache
+    when it has them. Returns (rows, failed): the Practice-Location rows, practice by practice in the given
+    order, and {cloud_id: {'practice_id', 'reason'}} for the practices whose request failed.
+    """
+    cloud_ids = list(practice_id_to_cloud_id.keys())
+    locations = cache.get_locations(cloud_ids) if cache is not None else {}
+    to_fetch = [cloud_id for cloud_id in cloud_ids if cloud_id not in locations]
+    processed_count = 0
+
+    def show_progress(batch):
+        nonlocal processed_count
+        processed_count += len(batch)
+        sys.stdout.write(f"\rProcessed Practice IDs: {processed_count}/{len(to_fetch)} ")
+        if processed_count == len(to_fetch):
+            sys.stdout.write("\n")  # Move to next line after progress
+        sys.stdout.flush()
+
+    failed = {}
+
+    def collect(results):
+        # Keeps (and caches) the locations of every complete response; returns the practices to ask for again
+        unresolved = []
+        for batch, response in results:
+            if not isinstance(response, Exception) and response.status_code == 200:
+                result = response.json()
+                fetched, unplaced = group_locations(batch, result.get('practice_locations', []))
+                if not unplaced:
+                    locations.update(fetched)
+                    if cache is not None:
+                        cache.put_locations(fetched)
+                    continue
+                # Some of the practices would be left with too few locations, so none of the batch is kept
+                print(f"\n{unplaced} locations in the response for {len(batch)} practices don't name a requested practice.")
+                if len(batch) > 1:
+                    unresolved.extend(batch)
+                    continue
+                reason = f"{unplaced} locations not belonging to the requested practice"
+            else:
+                print(f"Failed to fetch locations for Cloud IDs {', '.join(batch)}: {describe_failure(response)}")
+                if not isinstance(response, Exception):
+                    print(response.text)
+                reason = describe_failure(response)
+            for cloud_id in batch:
+                failed[cloud_id] = {'practice_id': practice_id_to_cloud_id[cloud_id], 'reason': reason}
+        return unresolved
+
+    # Batched requests, several on the wire at once
+    if to_fetch:
+        unresolved = collect(provider_reference.post_batched(provider_reference.LOCATIONS_PATH, "practice_ids",
+                                                             to_fetch, LOCATION_BATCH_SIZE, MAX_LOCATION_BATCH_SIZE,
+                                                             on_done=show_progress))
+        if unresolved:
+            # On its own, a practice gets every location of the response, named or not
+            print(f"Requesting the locations of {len(unresolved)} practices again, one practice per request...")
+            collect(provider_reference.post_batched(provider_reference.LOCATIONS_PATH, "practice_ids", unresolved, 1, 1))
+    rows = []
+    for cloud_id in cloud_ids:
+        for loc in locations.get(cloud_id, []):
+            rows.append(location_row(practice_id_to_cloud_id[cloud_id], cloud_id, loc))
+    return rows, failed
+
+def report_cache(cache):
+    cache.report()
+    for kind, stats in cache.stats.items():
+        run_manifest.count(f"{kind}_cache_hits", stats['hits'])
+        run_manifest.count(f"{kind}_cache_misses", stats['misses'])
+
+def save_failed_requests(output_path, failed_practice_ids, failed_locations):
+    """Writes the failed-request queue of output_path, or removes it when nothing failed."""
+    path = failed_requests_path(output_path)
+    if not failed_practice_ids and not failed_locations:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({'practice_ids': failed_practice_ids, 'locations': failed_locations}, fh, indent=2)
+    print(f"{len(failed_practice_ids)} practices are missing their cloud ID and {len(failed_locations)} their "
+          f"locations; queued in {path}. Run 'python api_for_location.py --retry-failed' to fetch only those.")
+
+def retry_failed_requests(output_path=output_path, cache=None):
+    """
+    Re-sends only the requests queued by an earlier fetch into output_path, appends the locations they
+    return to it and keeps whatever still fails queued. Returns the updated sheet as a columnar table.
+    """
+    path = failed_requests_path(output_path)
+    if not os.path.isfile(path):
+        print(f"No failed requests queued for {output_path}.")
+        return load_input_table(output_path)
+    with open(path, encoding='utf-8') as fh:
+        queued = json.load(fh)
+    print(f"Retrying {len(queued['practice_ids'])} cloud ID and {len(queued['locations'])} location lookups...")
+    cloud_id_map, failed_practice_ids = fetch_cloud_ids(list(queued['practice_ids']), cache)
+    practice_id_to_cloud_id = {cloud_id: entry['practice_id'] for cloud_id, entry in queued['locations'].items()}
+    for pid, cloud_id in cloud_id_map.items():
+        if cloud_id:
+            practice_id_to_cloud_id[str(cloud_id)] = pid
+    rows, failed_locations = fetch_location_rows(practice_id_to_cloud_id, cache)
+
+    table = load_input_table(output_path)
+    rows = [row for row in rows if has_location(row)]
+    for column, field in enumerate(PRACTICE_LOCATION_COLUMNS):
+        table.setdefault(field, []).extend(row[column] for row in rows)
+    write_practice_location_workbook(table, output_path)
+    print(f"Merged {len(rows)} recovered location rows into {output_path}.")
+    save_failed_requests(output_path, failed_practice_ids, failed_locations)
+    return table
+
+def has_location(row):
+    # Rows with only Practice ID and Practice Cloud ID (the rest None or empty) carry no location
+    return any(value is not None and value != '' for value in row[2:])
+
+def write_practice_location_workbook(table, path):
+    """Writes the columnar Practice-Location table to path as the styled sheet, in one pass."""
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet('Practice ID')
+    # Header fill color '000AD6', font color 'FFFFFF', frozen, with an autofilter over all columns
+    header_fill = PatternFill(start_color='000AD6', end_color='000AD6', fill_type='solid')
+    header_font = Font(color='FFFFFF', bold=True)
+    header = []
+    for field in table:
+        cell = WriteOnlyCell(sheet, value=field)
+        cell.fill = header_fill
+        cell.font = header_font
+        header.append(cell)
+    row_count = len(next(iter(table.values()), []))
+    sheet.freeze_panes = 'A2'
+    sheet.auto_filter.ref = f"A1:{get_column_letter(max(1, len(table)))}{row_count + 1}"
+    sheet.append(header)
+    for row in zip(*table.values()):
+        sheet.append(row)
+    wb.save(path)
+
+def practice_location_frame(table):
+    """The DataFrame pd.read_excel returns for the sheet holding the columnar table, built without reading it back."""
+    return table_frame(table)
+
+def fetch_practice_locations(input_path=input_path, output_path=output_path, retry_failed=False, refresh=False,
+                             cache_path=PROVIDER_REFERENCE_CACHE_FILE):
+    """
+    Builds Practice-Location.xlsx for the practice IDs in the input workbook (cloud IDs plus
+    location details from provider-reference) and returns the finished sheet as a DataFrame.
+    See fetch_practice_location_table() for the options.
+    """
+    return practice_location_frame(fetch_practice_location_table(input_path, output_path, retry_failed=retry_failed,
+                                                                 refresh=refresh, cache_path=cache_path))
+
+def fetch_practice_location_table(input_path=input_path, output_path=output_path, retry_failed=False, refresh=False,
+                                  cache_path=PROVIDER_REFERENCE_CACHE_FILE):
+    """
+    Builds Practice-Location.xlsx like fetch_practice_locations() and returns its rows as a columnar table
+    (header -> list of values, as input_table.load_input_table() reads a sheet). input_path is the input
+    workbook or its already loaded table. Responses cached in cache_path by earlier runs are reused unless refresh=True.
+    Requests that still fail after their retries are queued next to it; with retry_failed=True an
+    existing Practice-Location.xlsx is only completed from that queue instead of being rebuilt.
+    """
+    cache = ProviderReferenceCache(cache_path, refresh=refresh, service=provider_reference.service_url())
+    try:
+        if retry_failed and os.path.isfile(output_path):
+            return retry_failed_requests(output_path, cache)
+        return build_practice_locations(input_path, output_path, cache)
+    finally:
+        report_cache(cache)
+        cache.close()
+
+def build_practice_locations(input_path, output_path, cache=None):
+    """
+    The full fetch behind fetch_practice_location_table(), taking responses from cache when it has them.
+    The practice and location rows are put together in memory and the workbook is written once.
+    """
+    # Step 1: Unique Practice IDs of the input (numbers only, as Practice-Location has always listed them)
+    practice_id_set = read_unique_practice_ids(input_path)
+    unique_practice_ids = list(dict.fromkeys(str(pid) for pid in numeric_practice_ids(practice_id_set)))
+    print(f"Number of Unique Practice IDs in the Batch: {len(unique_practice_ids)}")
+
+    # Step 2: Cloud ID of each practice
+    print("Fetching Practice Cloud IDs...")
+    cloud_id_map, failed_practice_ids = fetch_cloud_ids(unique_practice_ids, cache)
+
+    # Step 3: Location details of every practice with a cloud ID, practice by practice in Practice ID order
+    practice_id_to_cloud_id = {}
+    for pid in unique_practice_ids:
+        cloud_id = cloud_id_map.get(pid)
+        if cloud_id:
+            practice_id_to_cloud_id[str(cloud_id)] = pid
+    print(f"Number of Practice IDs to process for location details: {len(practice_id_to_cloud_id)}")
+    rows, failed_locations = fetch_location_rows(practice_id_to_cloud_id, cache)
+
+    # Step 4: Keep the rows that have location details and write the sheet once
+    rows = [row for row in rows if has_location(row)]
+    table = {field: [row[column] for row in rows] for column, field in enumerate(PRACTICE_LOCATION_COLUMNS)}
+    write_practice_location_workbook(table, output_path)
+    print(f"Wrote {len(rows)} location rows for {len(practice_id_to_cloud_id)} practices to {output_path}.")
+    save_failed_requests(output_path, failed_practice_ids, failed_locations)
+    return table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch cloud IDs and locations of the input's practices.")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="only re-send the requests that failed last time and merge them into the workbook")
+    parser.add_argument('--refresh', action='store_true', help="ignore the cached responses")
+    parser.add_argument('--base-url', help=f"provider-reference to use (default: ${provider_reference.BASE_URL_ENV} "
+                                           f"or {provider_reference.BASE_URL})")
+    args = parser.parse_args()
+    if args.base_url:
+        os.environ[provider_reference.BASE_URL_ENV] = args.base_url
+    fetch_practice_locations(retry_failed=args.retry_failed, refresh=args.refresh)
@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pipeline import WORK_DIR, default_artifacts, run_pipeline
+from run_manifest import MANIFEST_FILE_NAME, artifact_rows
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+# Runs several input workbooks through the pipeline at once, one worker process per batch. Every batch
+# gets its own working folder (Output.xlsx, Mergedoutput.xlsx, Practice-Location.xlsx, run manifest,
+# checkpoints and a run.log with everything it printed), so batches never overwrite each other's files.
+
+BATCH_ROOT = os.path.join(WORK_DIR, "batches")
+SUMMARY_FILE_NAME = "batch_summary.json"
+
+def collect_inputs(paths):
+    """Expands directories to the .xlsx files in them (skipping Excel's ~$ lock files) and keeps files as given."""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            inputs.extend(sorted(file for file in glob.glob(os.path.join(path, '*.xlsx'))
+                                 if not os.path.basename(file).startswith('~$')))
+        else:
+            inputs.append(path)
+    return [os.path.abspath(path) for path in inputs]
+
+def batch_work_dir(batch_root, input_file):
+    """Working folder of one batch: a sub-folder of batch_root named after the input file."""
+    return os.path.join(batch_root, os.path.splitext(os.path.basename(input_file))[0])
+
+def run_batch(input_file, work_dir, template_file, resume=False, retry_failed=False, refresh=False):
+    """
+    Runs one input workbook through the pipeline in work_dir, with its output going to work_dir/run.log.
+    Returns a summary dict; a failing batch is reported there instead of raising, so the others carry on.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    summary = {'input_file': input_file, 'work_dir': work_dir, 'status': 'ok', 'error': None, 'rows': None,
+               'merged_file': None, 'manifest': os.path.join(work_dir, MANIFEST_FILE_NAME)}
+    start = time.perf_counter()
+    with open(os.path.join(work_dir, 'run.log'), 'w', encoding='utf-8') as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                artifacts = {'template_file': template_file, 'retry_failed_locations': retry_failed,
+                             'refresh_locations': refresh}
+                state = run_pipeline(input_file, work_dir=work_dir, artifacts=artifacts, resume=resume)
+                summary['rows'] = artifact_rows(state['merged_final'])
+                summary['merged_file'] = state['merged_path']
+            except Exception as e:
+                traceback.print_exc()
+                summary['status'] = 'failed'
+                summary['error'] = f"{type(e).__name__}: {e}"
+    summary['seconds'] = round(time.perf_counter() - start, 1)
+    return summary
+
+def run_batches(input_files, batch_root=BATCH_ROOT, max_workers=None, resume=False, retry_failed=False,
+                refresh=False):
+    """
+    Runs every input file in its own worker process (at most max_workers at a time, default one per CPU),
+    prints a line per finished batch and writes the consolidated summary to batch_root/batch_summary.json.
+    """
+    template_file = default_artifacts(None)['template_file']
+    names = [batch_work_dir(batch_root, input_file) for input_file in input_files]
+    if len(set(names)) != len(names):
+        raise ValueError("Input files must have distinct names, each one gets a folder named after it")
+    start = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_batch, input_file, work_dir, template_file, resume, retry_failed, refresh)
+                   for input_file, work_dir in zip(input_files, names)]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            print(f"[{summary['status']}] {os.path.basename(summary['input_file'])}: "
+                  f"{summary['rows']} providers in {summary['seconds']}s"
+                  + (f" - {summary['error']}" if summary['error'] else ""))
+    summaries.sort(key=lambda summary: input_files.index(summary['input_file']))
+    total = {
+        'batches': len(summaries),
+        'failed': sum(1 for summary in summaries if summary['status'] != 'ok'),
+        'providers': sum(summary['rows'] or 0 for summary in summaries),
+        'wall_seconds': round(time.perf_counter() - start, 1),
+        'batch_seconds': round(sum(summary['seconds'] for summary in summaries), 1),
+    }
+    os.makedirs(batch_root, exist_ok=True)
+    summary_path = os.path.join(batch_root, SUMMARY_FILE_NAME)
+    with open(summary_path, 'w', encoding='utf-8') as fh:
+        json.dump({'total': total, 'batches': summaries}, fh, indent=2)
+    print(f"\n{total['batches']} batches ({total['failed']} failed), {total['providers']} providers, "
+          f"{total['wall_seconds']}s wall for {total['batch_seconds']}s of batch time")
+    print(f"Summary written to {summary_path}")
+    return summaries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several scope sheets through the pipeline in parallel.")
+    parser.add_argument('inputs', nargs='+', help="input workbooks and/or folders of workbooks")
+    parser.add_argument('--out', default=BATCH_ROOT, help="folder for the per-batch working folders")
+    parser.add_argument('--workers', type=int, default=None, help="parallel batches (default: CPU count)")
+    parser.add_argument('--resume', action='store_true', help="reuse each batch's checkpoints from a previous run")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="only re-send each batch's location requests that failed last time")
+    parser.add_argument('--refresh', action='store_true', help="refetch cloud IDs and locations, ignoring the cache")
+    args = parser.parse_args(argv)
+    input_files = collect_inputs(args.inputs)
+    if not input_files:
+        raise SystemExit("No input workbooks found.")
+    batch_root = os.path.abspath(args.out)
+    # The stages read reference files (street suffixes, template) relative to the project folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    summaries = run_batches(input_files, batch_root, max_workers=args.workers, resume=args.resume,
+                            retry_failed=args.retry_failed, refresh=args.refresh)
+    if any(summary['status'] != 'ok' for summary in summaries):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import provider_reference
+from mock_provider_reference import start_mock_server, stop_mock_server
+from pipeline import default_artifacts, run_pipeline
+from checkpoint import CHECKPOINT_DIR_NAME
+from row_cache import ROW_CACHE_DIR_NAME
+from run_manifest import MANIFEST_FILE_NAME
+from synthetic_data import MERGED_PROVIDER_FIXTURE_NAME, write_scope_sheet
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+# Offline scale benchmark: generates synthetic scope sheets of each size, runs the whole pipeline on them
+# with the provider-reference results injected (or, with --mock-locations, fetched from a local
+# mock_provider_reference.py server) and the specialty lookup answered by the synthetic
+# merged_provider fixture (so no network or SSO is needed) and reports the wall/CPU time of every stage
+# from the run manifests. Each size runs in its own process with a time limit, so the sizes the pipeline
+# can't handle show up as timeouts with the stage they got stuck in.
+
+BENCHMARK_ROOT = os.path.join("Excel Files", "benchmarks")
+RESULTS_FILE_NAME = "benchmark_results.json"
+NPI_CACHE_FILE_NAME = "npi_cache.sqlite"
+PROVIDER_REFERENCE_CACHE_FILE_NAME = "provider_reference_cache.sqlite"
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+def run_size(rows, work_dir, seed=0, mock_locations=None):
+    """
+    Generates a rows-provider batch in work_dir and runs the pipeline on it from a cold start. With
+    mock_locations (MockProviderReferenceServer options) the location stage runs too, against a local
+    mock provider-reference serving the batch's Practice-Location table.
+    """
+    for name in (CHECKPOINT_DIR_NAME, ROW_CACHE_DIR_NAME):
+        shutil.rmtree(os.path.join(work_dir, name), ignore_errors=True)
+    npi_cache_file = os.path.join(work_dir, NPI_CACHE_FILE_NAME)
+    provider_reference_cache_file = os.path.join(work_dir, PROVIDER_REFERENCE_CACHE_FILE_NAME)
+    for cache_file in (npi_cache_file, provider_reference_cache_file):
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+    input_path, practice_location_df, _ = write_scope_sheet(rows, work_dir, seed=seed)
+    artifacts = {
+        'template_file': default_artifacts(None)['template_file'],
+        'practice_location_df': practice_location_df,
+        # The specialty lookup really runs, against the fixture and an NPI cache of its own
+        'provider_fixture': os.path.join(work_dir, MERGED_PROVIDER_FIXTURE_NAME),
+        'npi_cache_file': npi_cache_file,
+    }
+    if mock_locations is None:
+        run_pipeline(input_path, work_dir=work_dir, artifacts=artifacts)
+        return
+    del artifacts['practice_location_df']
+    artifacts['provider_reference_cache_file'] = provider_reference_cache_file
+    server = start_mock_server(practice_location_df, seed=seed, **mock_locations)
+    os.environ[provider_reference.BASE_URL_ENV] = server.base_url
+    try:
+        run_pipeline(input_path, work_dir=work_dir, artifacts=artifacts)
+    finally:
+        stop_mock_server(server)
+        server.report()
+
+def summarize(rows, work_dir, status, seconds):
+    """Per-stage times of one size, read back from the manifest its run wrote."""
+    result = {'rows': rows, 'status': status, 'seconds': round(seconds, 1), 'stages': {}}
+    manifest_path = os.path.join(work_dir, MANIFEST_FILE_NAME)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+        for stage in manifest['stages']:
+            result['stages'][stage['name']] = {key: stage[key] for key in ('status', 'wall_seconds', 'cpu_seconds')}
+    return result
+
+def print_table(results):
+    stage_names = []
+    for result in results:
+        for name in result['stages']:
+            if name not in stage_names and '/' not in name:
+                stage_names.append(name)
+    print(f"\n{'stage':<22}" + ''.join(f"{result['rows']:>12,}" for result in results))
+    for name in stage_names:
+        cells = []
+        for result in results:
+            stage = result['stages'].get(name)
+            if stage is None:
+                cells.append('-')
+            elif stage['status'] == 'running':
+                cells.append('stuck')
+            else:
+                cells.append(f"{stage['wall_seconds']:.1f}s")
+        print(f"{name:<22}" + ''.join(f"{cell:>12}" for cell in cells))
+    print(f"{'total':<22}" + ''.join(f"{result['seconds']:>11.1f}s" for result in results))
+    print(f"{'status':<22}" + ''.join(f"{result['status']:>12}" for result in results))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic scope sheets.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="provider rows per run")
+    parser.add_argument('--timeout', type=int, default=3600, help="seconds allowed per size")
+    parser.add_argument('--out', default=BENCHMARK_ROOT, help="folder for the generated batches and results")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mock-locations', action='store_true',
+                        help="run the location stage against a local mock provider-reference instead of injecting it")
+    parser.add_argument('--mock-latency-ms', type=float, default=50, help="mock response delay")
+    parser.add_argument('--mock-error-rate', type=float, default=0.0, help="share of mock requests that fail")
+    parser.add_argument('--mock-rate-limit', type=int, help="mock requests per second before 429s")
+    parser.add_argument('--run-one', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    mock_locations = None
+    if args.mock_locations:
+        mock_locations = {'latency_ms': args.mock_latency_ms, 'error_rate': args.mock_error_rate,
+                          'rate_limit': args.mock_rate_limit}
+    # The stages read reference files (street suffixes, template) relative to the project folder
+    out_root = os.path.abspath(args.out)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.run_one is not None:
+        run_size(args.run_one, os.path.join(out_root, str(args.run_one)), seed=args.seed, mock_locations=mock_locations)
+        return
+
+    results = []
+    for rows in args.sizes:
+        work_dir = os.path.join(out_root, str(rows))
+        os.makedirs(work_dir, exist_ok=True)
+        print(f"--- Benchmark: {rows} rows (log: {os.path.join(work_dir, 'benchmark.log')}) ---")
+        command = [sys.executable, os.path.abspath(__file__), '--run-one', str(rows), '--out', out_root,
+                   '--seed', str(args.seed)]
+        if args.mock_locations:
+            command += ['--mock-locations', '--mock-latency-ms', str(args.mock_latency_ms),
+                        '--mock-error-rate', str(args.mock_error_rate)]
+            if args.mock_rate_limit:
+                command += ['--mock-rate-limit', str(args.mock_rate_limit)]
+        start = time.perf_counter()
+        with open(os.path.join(work_dir, 'benchmark.log'), 'w', encoding='utf-8') as log:
+            try:
+                completed = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                           timeout=args.timeout)
+                status = 'ok' if completed.returncode == 0 else 'failed'
+            except subprocess.TimeoutExpired:
+                status = 'timeout'
+        result = summarize(rows, work_dir, status, time.perf_counter() - start)
+        results.append(result)
+        print(f"{rows} rows: {status} in {result['seconds']}s")
+    print_table(results)
+    results_path = os.path.join(out_root, RESULTS_FILE_NAME)
+    with open(results_path, 'w', encoding='utf-8') as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Results written to {results_path}")
+
+if __name__ == "__main__":
+    main()
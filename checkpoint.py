@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import pickle
+import pandas as pd
+
+# Stage checkpoints for resuming a run. Every stage gets a key hashed from its name and the fingerprints
+# of its inputs: source files are fingerprinted by their content, artifacts made by an earlier stage by
+# that stage's key. A checkpoint stores the stage's outputs under its key, so a resumed run can reuse it
+# exactly when nothing the stage depends on has changed since it was written.
+
+CHECKPOINT_DIR_NAME = ".checkpoints"
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def file_fingerprint(path):
+    """Content hash of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def artifact_fingerprint(value):
+    """Content hash of an in-memory artifact handed to the pipeline from outside (e.g. a prebuilt DataFrame)."""
+    if isinstance(value, pd.DataFrame):
+        row_hashes = pd.util.hash_pandas_object(value, index=True).values.tobytes()
+        return _sha256(repr(list(value.columns)).encode('utf-8') + row_hashes)
+    if isinstance(value, str):
+        return _sha256(value.encode('utf-8'))
+    return _sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+def stage_key(stage_name, input_fingerprints):
+    """Key of a stage run: its name plus the (name, fingerprint) of every input, in order."""
+    return _sha256(json.dumps([stage_name, input_fingerprints]).encode('utf-8'))
+
+class CheckpointStore:
+    """
+    One file per stage in directory: a small pickled header with the key it was written for and a
+    SHA-256 of the outputs, followed by the pickled outputs. has() only reads the header and checks the
+    bytes, so a resumed run can tell which checkpoints it could use before unpickling any of them, and a
+    truncated or edited checkpoint is never restored.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, stage_name):
+        return os.path.join(self.directory, f"{stage_name}.pkl")
+
+    def _read(self, stage_name, key):
+        # The pickled outputs stored for stage_name if they were written for key and are intact, otherwise None
+        path = self._path(stage_name)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as fh:
+                header = pickle.load(fh)
+                # ('outputs' in the header: written before the outputs were stored after it)
+                if not isinstance(header, dict) or header.get('key') != key or 'outputs' in header:
+                    return None
+                payload = fh.read()
+        except (OSError, EOFError, pickle.UnpicklingError) as exc:
+            print(f"Ignoring unreadable checkpoint {path}: {exc}")
+            return None
+        if _sha256(payload) != header.get('outputs_sha256'):
+            print(f"Ignoring corrupt checkpoint {path}")
+            return None
+        return payload
+
+    def has(self, stage_name, key):
+        """True when an intact checkpoint of stage_name written for key is there to restore."""
+        return self._read(stage_name, key) is not None
+
+    def load(self, stage_name, key):
+        """Returns the outputs stored for stage_name if they were written for key, otherwise None."""
+        payload = self._read(stage_name, key)
+        return pickle.loads(payload) if payload is not None else None
+
+    def save(self, stage_name, key, outputs):
+        """Stores outputs (a dict of artifacts) as the checkpoint of stage_name for key."""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL)
+        header = {'stage': stage_name, 'key': key, 'outputs_sha256': _sha256(payload)}
+        path = self._path(stage_name)
+        # Write next to the old checkpoint and swap, so a crash mid-write leaves the previous one intact
+        with open(path + '.tmp', 'wb') as fh:
+            pickle.dump(header, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            fh.write(payload)
+        os.replace(path + '.tmp', path)
+        return path
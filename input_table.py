@@ -0,0 +1,61 @@
+import openpyxl
+from pandas.io.parsers import TextParser
+
+def load_input_table(input_file):
+    """
+    Reads the active sheet of the input workbook in one pass and returns it as a columnar table:
+    a dict mapping each header to the list of values in that column (one entry per data row).
+    When a header appears more than once, the first column with that name is kept.
+    """
+    wb_in = openpyxl.load_workbook(input_file, read_only=True)
+    try:
+        ws_in = wb_in.active
+        if ws_in is None:
+            raise ValueError("Input worksheet could not be loaded.")
+        # Don't trust the stored sheet size, it can count trailing rows that hold no cells
+        ws_in.reset_dimensions()
+        rows = ws_in.iter_rows(values_only=True)
+        input_header_row = list(next(rows, ()))
+        width = len(input_header_row)
+        columns = [[] for _ in range(width)]
+        pending_empty = 0
+        for row in rows:
+            # Rows without any cells only count if a later row has data (same as a normal load)
+            if not row:
+                pending_empty += 1
+                continue
+            for idx in range(width):
+                column = columns[idx]
+                column.extend([None] * pending_empty)
+                # Read-only rows can be shorter than the header when trailing cells are empty
+                column.append(row[idx] if idx < len(row) else None)
+            pending_empty = 0
+    finally:
+        wb_in.close()
+    input_table = {}
+    for header, values in zip(input_header_row, columns):
+        if header is not None and header not in input_table:
+            input_table[header] = values
+    return input_table
+
+def as_input_table(source):
+    """Returns source unchanged if it is already an input table, otherwise loads it from the given path."""
+    if isinstance(source, dict):
+        return source
+    return load_input_table(source)
+
+def input_row_count(input_table):
+    """Number of data rows in the table (0 for a sheet with only a header)."""
+    for values in input_table.values():
+        return len(values)
+    return 0
+
+def table_frame(input_table):
+    """
+    The DataFrame pd.read_excel returns for the sheet the table was read from, built without reading it
+    again: same type inference (numeric text becomes numbers, empty cells NaN) and no trailing empty rows.
+    """
+    rows = [list(row) for row in zip(*input_table.values())]
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+    return TextParser([list(input_table)] + rows, header=0).read()
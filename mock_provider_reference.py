@@ -0,0 +1,205 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import provider_reference
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+# Local stand-in for the provider-reference service, so the location stage can run, be benchmarked and
+# be stress-tested offline. It answers ids-by-monolith-ids~batchGet and location~batchGet from a
+# Practice-Location table (a workbook api_for_location.py wrote earlier, or synthetic_data.py's) and can
+# add latency, random 5xx errors and 429 rate limiting. Point the client at it with the
+# PROVIDER_REFERENCE_URL environment variable (or api_for_location.py --base-url).
+
+DEFAULT_PORT = 8765
+# Practice-Location columns that aren't part of a location~batchGet entry
+NON_LOCATION_COLUMNS = ['Practice ID', 'Practice Cloud ID', 'Location Type']
+
+def _json_value(value):
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def _practice_id(value):
+    # Practice IDs read from a workbook may come back as floats
+    return str(int(value)) if isinstance(value, float) else str(value)
+
+def load_fixture(fixture):
+    """
+    ({monolith_id: cloud_id}, {cloud_id: [location, ...]}) from a Practice-Location table: a DataFrame or
+    the path of a .xlsx/.csv file with Practice ID, Practice Cloud ID and the location columns.
+    """
+    if isinstance(fixture, pd.DataFrame):
+        df = fixture
+    elif fixture.lower().endswith('.csv'):
+        df = pd.read_csv(fixture, dtype=object)
+    else:
+        df = pd.read_excel(fixture, dtype=object)
+    cloud_ids = {}
+    locations = {}
+    for row in df.to_dict('records'):
+        practice_id, cloud_id = _json_value(row.get('Practice ID')), _json_value(row.get('Practice Cloud ID'))
+        if practice_id is None or cloud_id is None:
+            continue
+        cloud_id = str(cloud_id)
+        cloud_ids[_practice_id(practice_id)] = cloud_id
+        practice_locations = locations.setdefault(cloud_id, [])
+        loc = {key: _json_value(value) for key, value in row.items() if key not in NON_LOCATION_COLUMNS}
+        # A practice row without any location details only maps the practice to its cloud ID
+        if all(value is None for value in loc.values()):
+            continue
+        loc['practice_id'] = cloud_id
+        practice_locations.append(loc)
+    return cloud_ids, locations
+
+class MockProviderReferenceServer(ThreadingHTTPServer):
+    """
+    Serves the fixture on (host, port); port 0 picks a free one. Every request waits latency_ms
+    (+/- jitter_ms), then fails with error_status at error_rate, and anything beyond rate_limit requests
+    per second gets a 429 with a Retry-After header. stats counts what was answered.
+    """
+    daemon_threads = True
+
+    def __init__(self, fixture, host='127.0.0.1', port=DEFAULT_PORT, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 error_status=503, rate_limit=None, seed=0, verbose=False):
+        super().__init__((host, port), MockHandler)
+        self.cloud_ids, self.locations = load_fixture(fixture)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'not_found': 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{provider_reference.BASE_PATH}"
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[outcome] += 1
+
+    def _rate_limited(self):
+        # Fixed one-second windows: the first rate_limit requests of each window get through
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_requests = 0
+            self.window_requests += 1
+            return self.window_requests > self.rate_limit
+
+    def respond(self, path, body):
+        """(status, payload, headers) for one POST."""
+        if self._rate_limited():
+            self._count('rate_limited')
+            return 429, {'error': 'rate limited'}, {'Retry-After': '1'}
+        delay_ms = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        with self.lock:
+            fail = self.rng.random() < self.error_rate
+        if fail:
+            self._count('errors')
+            return self.error_status, {'error': 'injected failure'}, {}
+        if path.endswith(provider_reference.CLOUD_IDS_PATH):
+            practice_ids = []
+            for monolith_id in body.get('monolith_practice_ids', []):
+                cloud_id = self.cloud_ids.get(str(monolith_id))
+                if cloud_id is not None:
+                    practice_ids.append({'monolith_practice_id': int(monolith_id) if str(monolith_id).isdigit()
+                                         else monolith_id, 'practice_id': cloud_id})
+            self._count('ok')
+            return 200, {'practice_ids': practice_ids}, {}
+        if path.endswith(provider_reference.LOCATIONS_PATH):
+            locations = [loc for cloud_id in body.get('practice_ids', []) for loc in self.locations.get(cloud_id, [])]
+            self._count('ok')
+            return 200, {'practice_locations': locations}, {}
+        self._count('not_found')
+        return 404, {'error': f'unknown path {path}'}, {}
+
+    def report(self):
+        print("Mock provider-reference: " + ', '.join(f"{count} {name.replace('_', ' ')}"
+                                                      for name, count in self.stats.items()))
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            status, payload, headers = 400, {'error': 'body is not JSON'}, {}
+        else:
+            status, payload, headers = self.server.respond(self.path, body)
+        data = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def start_mock_server(fixture, **options):
+    """Starts a MockProviderReferenceServer (port 0 by default) in a background thread and returns it."""
+    options.setdefault('port', 0)
+    server = MockProviderReferenceServer(fixture, **options)
+    threading.Thread(target=server.serve_forever, name='mock-provider-reference', daemon=True).start()
+    return server
+
+def stop_mock_server(server):
+    server.shutdown()
+    server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a Practice-Location table as a local provider-reference.")
+    parser.add_argument('fixture', help="Practice-Location .xlsx/.csv to answer from")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0, help="delay before every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="random +/- added to the delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests that fail (0-1)")
+    parser.add_argument('--error-status', type=int, default=503, help="status of the injected failures")
+    parser.add_argument('--rate-limit', type=int, help="requests per second before answering 429")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+    server = MockProviderReferenceServer(args.fixture, host=args.host, port=args.port, latency_ms=args.latency_ms,
+                                         jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                         error_status=args.error_status, rate_limit=args.rate_limit,
+                                         seed=args.seed, verbose=args.verbose)
+    print(f"Serving {len(server.cloud_ids)} practices on {server.base_url} (Ctrl-C to stop)")
+    print(f"Point the location fetch at it with {provider_reference.BASE_URL_ENV}={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import sqlite3
+import time
+
+# Local cache of Snowflake NPI lookups, shared by every run, batch and singleapisearch.py. One row per NPI
+# with the FIRST_NAME/LAST_NAME/SPECIALTIES of its first specialty record and the time it was fetched.
+# NPIs that Snowflake doesn't know are stored too (found = 0), so they aren't queried again on every run;
+# they expire sooner than found ones because new providers show up in merged_provider over time.
+
+NPI_CACHE_FILE = os.path.join("Excel Files", "npi_cache.sqlite")
+NPI_CACHE_TTL_DAYS = 30
+NOT_FOUND_TTL_DAYS = 7
+RECORD_COLUMNS = ['NPI', 'FIRST_NAME', 'LAST_NAME', 'SPECIALTIES']
+
+def _cell(value):
+    # SQLite stores scalars as they are; anything else (a nested JSON value) as its JSON text
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if hasattr(value, 'item'):
+        return value.item()
+    return json.dumps(value, default=str)
+
+class NpiCache:
+    """
+    Lookup results keyed by NPI (string) in the SQLite file at path. get() returns (found, records) as
+    the Snowflake lookup does, or None when the NPI isn't cached or its entry is older than its TTL.
+    """
+
+    def __init__(self, path=NPI_CACHE_FILE, ttl_days=NPI_CACHE_TTL_DAYS, not_found_ttl_days=NOT_FOUND_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.not_found_ttl_seconds = not_found_ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Batches in other processes may write at the same time; wait for their lock instead of failing
+        self.conn = sqlite3.connect(path, timeout=60)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS npi_specialty (
+                    npi TEXT PRIMARY KEY,
+                    found INTEGER NOT NULL,
+                    record_npi,
+                    first_name,
+                    last_name,
+                    specialties,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, npi):
+        row = self.conn.execute(
+            "SELECT found, record_npi, first_name, last_name, specialties, fetched_at FROM npi_specialty WHERE npi = ?",
+            (npi,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        found, record_npi, first_name, last_name, specialties, fetched_at = row
+        ttl = self.ttl_seconds if found else self.not_found_ttl_seconds
+        if time.time() - fetched_at > ttl:
+            self.misses += 1
+            self.expired += 1
+            return None
+        self.hits += 1
+        records = []
+        # Rows without a specialty are dropped by the lookup, so a stored specialty means a stored record
+        if specialties is not None:
+            records.append(dict(zip(RECORD_COLUMNS, [record_npi, first_name, last_name, specialties])))
+        return bool(found), records
+
+    def put_many(self, results):
+        """Stores {npi: (found, records)} as fetched now, replacing older entries of the same NPIs."""
+        fetched_at = time.time()
+        rows = []
+        for npi, (found, records) in results.items():
+            record = records[0] if records else {}
+            rows.append((npi, int(found), *[_cell(record.get(col)) for col in RECORD_COLUMNS], fetched_at))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO npi_specialty VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def report(self):
+        print(f"NPI cache ({self.path}): {self.hits} hits, {self.misses} misses ({self.expired} expired)")
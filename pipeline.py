@@ -0,0 +1,314 @@
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+from input_table import load_input_table
+from _main_1 import build_provider_output, attach_location_sheet, apply_provider_validations
+from Location import build_location_workbook
+from Extract_NPI import create_npi_specialty_excel
+from api_for_specialty import update_npi_specialties
+from npi_cache import NPI_CACHE_FILE
+from provider_backend import open_backend
+from api_for_location import fetch_practice_locations
+from provider_reference_cache import PROVIDER_REFERENCE_CACHE_FILE
+from API_Datamerge import match_practice_locations, fill_specialty_ids, post_process_merged
+from locationmapping import run_location_mapping
+from Location_2 import run_location_review
+from workbook_session import WorkbookSession
+from checkpoint import CHECKPOINT_DIR_NAME, CheckpointStore, artifact_fingerprint, file_fingerprint, stage_key
+from run_manifest import MANIFEST_FILE_NAME, artifact_rows, recording, stage as manifest_stage, update_stage
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+# A stage takes its input artifacts (by name, in order) and returns a dict with its output artifacts.
+# checkpoint=True marks the stages worth keeping for --resume: the slow or network-bound lookups and the
+# finished merged workbook. The workbook stages in between are cheaper to redo than to pickle and unpickle.
+Stage = namedtuple('Stage', ['name', 'func', 'inputs', 'outputs', 'checkpoint'], defaults=[False])
+
+WORK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Excel Files")
+
+# Files a run reads but no stage writes; checkpoints are keyed on their content
+SOURCE_FILES = ['input_file', 'template_file', 'provider_fixture']
+
+# Stages whose inputs are ready run side by side on this many threads (the Snowflake and
+# provider-reference lookups wait on the network while the workbook stages keep the CPU busy)
+MAX_WORKERS = 4
+
+def default_artifacts(input_file, work_dir=WORK_DIR):
+    """File paths every run starts with. Stages add their outputs to this dict as they finish."""
+    return {
+        'input_file': input_file,
+        'template_file': os.path.join(work_dir, "New Business Scope Sheet - Practice Locations and Providers.xlsx"),
+        'output_file': os.path.join(work_dir, "Output.xlsx"),
+        'merged_file': os.path.join(work_dir, "Mergedoutput.xlsx"),
+        'npi_specialty_file': os.path.join(work_dir, "Npi-specialty.xlsx"),
+        'practice_location_file': os.path.join(work_dir, "Practice-Location.xlsx"),
+        # In the project's Excel Files folder whatever work_dir is, so every run and batch shares it
+        'npi_cache_file': os.path.join(WORK_DIR, os.path.basename(NPI_CACHE_FILE)),
+        # A merged_provider fixture to look NPIs up in instead of Snowflake (see provider_backend.py)
+        'provider_fixture': None,
+        'provider_reference_cache_file': os.path.join(WORK_DIR, os.path.basename(PROVIDER_REFERENCE_CACHE_FILE)),
+        # Only re-send the provider-reference requests queued as failed by the last location fetch
+        'retry_failed_locations': False,
+        # Fetch every cloud ID and location again instead of using the cached responses
+        'refresh_locations': False,
+    }
+
+def read_input(input_file):
+    return {'input_table': load_input_table(input_file)}
+
+def provider_sheet(input_table, template_file, output_file):
+    return {'provider_output': build_provider_output(input_table, template_file, output_file)}
+
+def location_sheet(input_table, template_file):
+    return {'location_wb': build_location_workbook(input_table, template_file)}
+
+def output_workbook(provider_output, location_wb, output_file):
+    attach_location_sheet(provider_output, location_wb)
+    # provider_output is the in-memory Output.xlsx; this is where it is saved, once
+    apply_provider_validations(provider_output, output_file)
+    return {'output_workbook': provider_output}
+
+def npi_list(input_table, npi_specialty_file):
+    npi_values = create_npi_specialty_excel(input_table, npi_specialty_file)
+    return {'npi_df': pd.DataFrame({'NPI': npi_values})}
+
+def merged_workbook(output_workbook, merged_file):
+    # Mergedoutput starts as the saved Output.xlsx, so it takes over that workbook in memory instead of
+    # copying the file and loading it again. The post-processing stages all edit it; save_merged writes it out
+    return {'merged': WorkbookSession(os.path.abspath(merged_file), wb=output_workbook.wb)}
+
+def specialty_lookup(npi_df, npi_specialty_file, npi_cache_file, provider_fixture):
+    print("Running api_for_specialty.py...")
+    with open_backend(provider_fixture) as backend:
+        npi_specialty_df = update_npi_specialties(npi_df, excel_path=npi_specialty_file, npi_cache_path=npi_cache_file,
+                                                  backend=backend)
+    return {'npi_specialty_df': npi_specialty_df}
+
+def practice_locations(input_table, practice_location_file, provider_reference_cache_file, retry_failed_locations,
+                       refresh_locations):
+    print("Running api_for_location.py...")
+    return {'practice_location_df': fetch_practice_locations(input_table, practice_location_file,
+                                                             retry_failed=retry_failed_locations,
+                                                             refresh=refresh_locations,
+                                                             cache_path=provider_reference_cache_file)}
+
+def location_matching(merged, practice_location_df):
+    match_practice_locations(merged, practice_location_df)
+    return {'merged_locations': merged}
+
+def specialty_ids(merged_locations, npi_specialty_df):
+    fill_specialty_ids(merged_locations, npi_specialty_df)
+    return {'merged_specialties': merged_locations}
+
+def location_mapping(merged_specialties):
+    print("Running locationmapping.py as the last step...")
+    run_location_mapping(merged_specialties)
+    return {'merged_mapped': merged_specialties}
+
+def post_processing(merged_mapped, template_file):
+    post_process_merged(merged_mapped, template_file)
+    return {'merged_checked': merged_mapped}
+
+def location_review(merged_checked, input_table, practice_location_file, practice_location_df):
+    print("Running Location_2.py for post-processing...")
+    run_location_review(merged_checked, input_table, practice_location_file, practice_location_df)
+    print("Location_2.py completed.")
+    return {'merged_final': merged_checked}
+
+def save_merged(merged_final):
+    merged_final.save()
+    print(f"Saved {merged_final.path}")
+    return {'merged_path': merged_final.path}
+
+STAGES = [
+    Stage('input_table', read_input, ['input_file'], ['input_table'], checkpoint=True),
+    Stage('provider_sheet', provider_sheet, ['input_table', 'template_file', 'output_file'], ['provider_output']),
+    Stage('location_sheet', location_sheet, ['input_table', 'template_file'], ['location_wb']),
+    Stage('output_workbook', output_workbook, ['provider_output', 'location_wb', 'output_file'], ['output_workbook']),
+    Stage('npi_list', npi_list, ['input_table', 'npi_specialty_file'], ['npi_df']),
+    Stage('merged_workbook', merged_workbook, ['output_workbook', 'merged_file'], ['merged']),
+    Stage('specialty_lookup', specialty_lookup, ['npi_df', 'npi_specialty_file', 'npi_cache_file', 'provider_fixture'],
+          ['npi_specialty_df'], checkpoint=True),
+    Stage('practice_locations', practice_locations,
+          ['input_table', 'practice_location_file', 'provider_reference_cache_file', 'retry_failed_locations',
+           'refresh_locations'], ['practice_location_df'], checkpoint=True),
+    Stage('location_matching', location_matching, ['merged', 'practice_location_df'], ['merged_locations']),
+    Stage('specialty_ids', specialty_ids, ['merged_locations', 'npi_specialty_df'], ['merged_specialties']),
+    Stage('location_mapping', location_mapping, ['merged_specialties'], ['merged_mapped']),
+    Stage('post_processing', post_processing, ['merged_mapped', 'template_file'], ['merged_checked']),
+    Stage('location_review', location_review,
+          ['merged_checked', 'input_table', 'practice_location_file', 'practice_location_df'], ['merged_final'],
+          checkpoint=True),
+    Stage('save_merged', save_merged, ['merged_final'], ['merged_path']),
+]
+
+def _table_rows(state, names):
+    # Row counts of the artifacts that are tables, for the run manifest
+    rows = {name: artifact_rows(state[name]) for name in names}
+    return {name: count for name, count in rows.items() if count is not None}
+
+def _initial_fingerprints(state):
+    fingerprints = {}
+    for name, value in state.items():
+        if name in SOURCE_FILES and isinstance(value, str) and os.path.isfile(value):
+            fingerprints[name] = 'file:' + file_fingerprint(value)
+        elif isinstance(value, str):
+            # Paths the stages write to only name a location, their old content doesn't matter
+            fingerprints[name] = 'path:' + value
+        else:
+            fingerprints[name] = 'value:' + artifact_fingerprint(value)
+    return fingerprints
+
+def _files_present(stage, state, fingerprints):
+    # A restored stage doesn't rewrite its files, so they must still be there from the run that saved it
+    paths = [state[name] for name in stage.inputs if fingerprints[name].startswith('path:')]
+    return all(os.path.exists(path) for path in paths)
+
+def _check_graph(stages, state):
+    # Every input must be supplied or made by some stage, otherwise the scheduler would wait forever
+    available = set(state)
+    for stage in stages:
+        available.update(stage.outputs)
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in available]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' is missing inputs: {', '.join(missing)}")
+
+def _stage_keys(stages, fingerprints):
+    """
+    Keys of the stages, in an order where every stage comes after the ones it takes inputs from, and the
+    fingerprints of every artifact. An output is fingerprinted by the key of the stage making it, so
+    all of this is known before any stage runs.
+    """
+    fingerprints = dict(fingerprints)
+    keys = {}
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(name in fingerprints for name in stage.inputs)]
+        if not ready:
+            # A cycle; the scheduler reports it
+            break
+        for stage in ready:
+            remaining.remove(stage)
+            keys[stage.name] = stage_key(stage.name, [(name, fingerprints[name]) for name in stage.inputs])
+            for name in stage.outputs:
+                fingerprints[name] = f"stage:{keys[stage.name]}:{name}"
+    return keys, fingerprints
+
+def _resume_plan(stages, state, keys, fingerprints, store):
+    """
+    Names of the stages a resumed run restores and skips, as two sets. Working back from the
+    stages nothing else consumes, a stage with a usable checkpoint is restored when a stage that runs
+    needs one of its outputs, and a stage without one runs when its outputs are needed or its files are
+    gone. Everything else is skipped, so no checkpoint is unpickled unless something reads it.
+    """
+    consumed = {name for stage in stages for name in stage.inputs}
+    by_name = {stage.name: stage for stage in stages}
+    # Stages caught in a cycle have no key and are left for the scheduler to report
+    ordered = [by_name[name] for name in keys] + [stage for stage in stages if stage.name not in keys]
+    run, restore, needed = set(), set(), set()
+    for stage in reversed(ordered):
+        wanted = any(name in needed for name in stage.outputs)
+        files_present = stage.name in keys and _files_present(stage, state, fingerprints)
+        if stage.checkpoint and files_present and store.has(stage.name, keys[stage.name]):
+            if wanted:
+                restore.add(stage.name)
+            continue
+        if wanted or not files_present or not any(name in consumed for name in stage.outputs):
+            run.add(stage.name)
+            needed.update(stage.inputs)
+    skip = {stage.name for stage in stages} - run - restore
+    return restore, skip
+
+def _run_stage(stage, key, args, rows_in, store, restore):
+    # Runs on a worker thread: restores or runs one stage and returns its outputs
+    with manifest_stage(stage.name, rows_in=rows_in) as record:
+        if restore:
+            result = store.load(stage.name, key)
+            if result is None:
+                raise ValueError(f"Checkpoint of stage '{stage.name}' can't be restored; run without --resume")
+            print(f"--- Stage: {stage.name} (restored from checkpoint) ---")
+            update_stage(record, checkpoint='restored')
+        else:
+            print(f"--- Stage: {stage.name} ---")
+            result = stage.func(*args)
+            for name in stage.outputs:
+                if name not in result:
+                    raise ValueError(f"Stage '{stage.name}' did not produce '{name}'")
+            if stage.checkpoint:
+                # Saved right away: later stages edit the merged workbook in place (save_merged only writes it)
+                store.save(stage.name, key, {name: result[name] for name in stage.outputs})
+                update_stage(record, checkpoint='saved')
+        update_stage(record, rows_out=_table_rows(result, stage.outputs))
+    return result
+
+def run_pipeline(input_file, work_dir=WORK_DIR, stages=None, artifacts=None, manifest_path=None, resume=False,
+                 max_workers=MAX_WORKERS):
+    """
+    Runs the stages as a dependency graph in this process: a stage starts as soon as all of its inputs
+    exist, and up to max_workers ready stages run at the same time, handing in-memory tables to each other.
+    Stages whose outputs are already in 'artifacts' (e.g. a prebuilt 'practice_location_df') are skipped.
+    Timing, rows and workbook I/O of every stage go to manifest_path (default: run_manifest.json in work_dir).
+    Stages marked checkpoint=True leave a checkpoint in work_dir/.checkpoints as they finish. With
+    resume=True a stage whose inputs are unchanged since its checkpoint was written is restored from it
+    instead of being run, and only the stages needed to finish the run from there are run (see _resume_plan).
+    """
+    if stages is None:
+        stages = STAGES
+    if manifest_path is None:
+        manifest_path = os.path.join(work_dir, MANIFEST_FILE_NAME)
+    state = default_artifacts(input_file, work_dir)
+    if artifacts:
+        state.update(artifacts)
+    store = CheckpointStore(os.path.join(work_dir, CHECKPOINT_DIR_NAME))
+    pending = []
+    for stage in stages:
+        if all(name in state for name in stage.outputs):
+            print(f"--- Stage: {stage.name} (skipped, outputs supplied) ---")
+        else:
+            pending.append(stage)
+    _check_graph(pending, state)
+    keys, fingerprints = _stage_keys(pending, _initial_fingerprints(state))
+    restore = set()
+    if resume:
+        restore, skip = _resume_plan(pending, state, keys, fingerprints, store)
+        for stage in pending:
+            if stage.name in skip:
+                print(f"--- Stage: {stage.name} (skipped, not needed to resume) ---")
+        pending = [stage for stage in pending if stage.name not in skip]
+    with recording(manifest_path, input_file=os.path.abspath(input_file), resume=resume, max_workers=max_workers):
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+        running = {}
+        try:
+            while pending or running:
+                # Submit ready stages in their declared order; restored stages don't wait for their inputs
+                for stage in [stage for stage in pending
+                              if stage.name in restore or all(name in state for name in stage.inputs)]:
+                    pending.remove(stage)
+                    if stage.name in restore:
+                        args, rows_in = None, None
+                    else:
+                        args, rows_in = [state[name] for name in stage.inputs], _table_rows(state, stage.inputs)
+                    future = pool.submit(_run_stage, stage, keys.get(stage.name), args, rows_in, store,
+                                         stage.name in restore)
+                    running[future] = stage
+                if not running:
+                    raise ValueError(f"Stages can never start: {', '.join(stage.name for stage in pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    state.update(future.result())
+        finally:
+            # On a failure, let the stages already running finish but don't start queued ones
+            pool.shutdown(wait=True, cancel_futures=True)
+    return state
+
+if __name__ == "__main__":
+    from _main_1 import resolve_input_file
+    resume = '--resume' in sys.argv
+    artifacts = {'retry_failed_locations': '--retry-failed' in sys.argv, 'refresh_locations': '--refresh' in sys.argv}
+    run_pipeline(resolve_input_file([arg for arg in sys.argv if arg not in ('--resume', '--retry-failed', '--refresh')]),
+                 artifacts=artifacts, resume=resume)
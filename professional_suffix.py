@@ -1,38 +1,37 @@
 import openpyxl
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
+from validation_registry import add_column_dropdown
 import os
 import re
 from difflib import get_close_matches
 from openpyxl.styles import PatternFill
+from input_table import as_input_table
+from workbook_session import workbook_session
 
 def normalize_suffix(s):
     # Remove punctuation, spaces, lowercase everything
     return re.sub(r'[^a-zA-Z0-9]', '', s or '').lower()
 
 def get_dropdown_suffixes(template_file):
-    wb = openpyxl.load_workbook(template_file, data_only=True)
+    # template_file can also be a workbook that is already open (the template, or an output holding its
+    # ValidationAndReference sheet), so the pipeline doesn't load the template again for this list
+    if isinstance(template_file, openpyxl.Workbook):
+        wb = template_file
+    else:
+        wb = openpyxl.load_workbook(template_file, data_only=True)
     ws = wb['ValidationAndReference']
     # Column G = 7, rows 2-511
     suffixes = [ws.cell(row=i, column=7).value for i in range(2, 512)]
     suffixes = [s for s in suffixes if s and str(s).strip()]
     return suffixes
 
-def extract_professional_suffix(input_file, template_file='Excel Files/New Business Scope Sheet - Practice Locations and Providers.xlsx'):
+def extract_professional_suffix(input_table, template_file='Excel Files/New Business Scope Sheet - Practice Locations and Providers.xlsx'):
     dropdown_suffixes = get_dropdown_suffixes(template_file)
     norm_dropdown = {normalize_suffix(s): s for s in dropdown_suffixes}
-    wb_in = openpyxl.load_workbook(input_file)
-    ws_in = wb_in.active
-    if ws_in is None:
-        raise ValueError("Input worksheet could not be loaded.")
-    input_header_row = [cell.value for cell in ws_in[1]]
-    try:
-        license_idx = input_header_row.index('License Type')
-    except ValueError:
+    input_table = as_input_table(input_table)
+    if 'License Type' not in input_table:
         raise ValueError("'License Type' column not found in input file.")
     suffix_lists = []
-    for row in ws_in.iter_rows(min_row=2, values_only=True):
-        cell_value = row[license_idx]
+    for cell_value in input_table['License Type']:
         if cell_value is not None:
             split_values = [v.strip() for v in re.split(r'[\s,]+', str(cell_value)) if v.strip()]
         else:
@@ -54,9 +53,8 @@ def extract_professional_suffix(input_file, template_file='Excel Files/New Busin
     return suffix_lists
 
 
-def add_professional_suffix_dropdowns(output_file, template_file='Excel Files/New Business Scope Sheet - Practice Locations and Providers.xlsx'):
-    wb = openpyxl.load_workbook(output_file)
-    ws = wb['Provider']
+def add_professional_suffix_dropdowns(session, template_file='Excel Files/New Business Scope Sheet - Practice Locations and Providers.xlsx'):
+    ws = session['Provider']
     header_row = [cell.value for cell in ws[1]]
     # Load dropdown suffixes for validation
     dropdown_suffixes = get_dropdown_suffixes(template_file)
@@ -67,12 +65,8 @@ def add_professional_suffix_dropdowns(output_file, template_file='Excel Files/Ne
             col_idx = header_row.index(col_name) + 1  # 1-based index for openpyxl
         except ValueError:
             continue  # Skip if the column is not found
-        dv = DataValidation(type="list", formula1='=ValidationAndReference!$G$2:$G$511', allow_blank=True)
         max_row = ws.max_row
-        col_letter = get_column_letter(col_idx)
-        dv_range = f"{col_letter}2:{col_letter}{max_row}"
-        dv.add(dv_range)
-        ws.add_data_validation(dv)
+        add_column_dropdown(ws, col_idx, '=ValidationAndReference!$G$2:$G$511', last_row=max_row)
         # Highlight non-matching cells in red
         for row in range(2, max_row + 1):
             cell = ws.cell(row=row, column=col_idx)
@@ -88,8 +82,8 @@ def add_professional_suffix_dropdowns(output_file, template_file='Excel Files/Ne
                     cell.fill = red_fill
                 else:
                     cell.fill = PatternFill(fill_type=None)
-    wb.save(output_file)
 
 if __name__ == "__main__":
     output_file = os.path.join("Excel Files", "Output.xlsx")
-    add_professional_suffix_dropdowns(output_file)
+    with workbook_session(output_file) as session:
+        add_professional_suffix_dropdowns(session)
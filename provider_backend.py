@@ -0,0 +1,197 @@
+import sqlite3
+import time
+import pandas as pd
+import run_manifest
+import snowflake_session
+from npi_cache import RECORD_COLUMNS
+
+# Where the specialty lookup gets its provider data. SnowflakeBackend queries merged_provider in
+# CISTERN (SSO login on the first lookup); LocalBackend answers the same lookups from a fixture of
+# merged_provider rows loaded into SQLite, so the specialty stage can be tested and timed offline.
+# Both look up one chunk of NPIs (strings) per query and return {npi: (found, records)}, where records
+# holds the NPI's row if it has a specialty and is empty otherwise.
+
+# Chunk queries SnowflakeBackend keeps running on the warehouse at once, and how often it checks on them
+SNOWFLAKE_MAX_CONCURRENT_QUERIES = 4
+QUERY_POLL_SECONDS = 0.5
+
+def split_results(df, npis):
+    """{npi: (found, records)} for the looked-up npis, from a table with one row per NPI found."""
+    found = set(df['NPI'])
+    records = {row['NPI']: [row] for row in df[df['SPECIALTIES'].notnull()].to_dict('records')}
+    return {npi: (npi in found, records.get(npi, [])) for npi in npis}
+
+class ProviderBackend:
+    """Base of the backends; subclasses implement lookup_chunk()."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup_chunk(self, npis):
+        """Looks up one chunk of NPIs with a single query."""
+        raise NotImplementedError
+
+    def lookup_chunks(self, chunks):
+        """Yields the results of each chunk of NPIs as it completes."""
+        for chunk in chunks:
+            yield self.lookup_chunk(chunk)
+
+    def close(self):
+        pass
+
+def build_npi_lookup_query(npi_count):
+    """
+    Query for npi_count bound NPIs returning one row per NPI found: NPI, FIRST_NAME, LAST_NAME and the
+    first entry of SPECIALTIES, taken from a row that has a specialty whenever the NPI has one. Among
+    several such rows the lowest specialty (then last and first name) wins, so every run picks the same one.
+    """
+    placeholders = ', '.join(['%s'] * npi_count)
+    return f"""
+    SELECT
+        p.NPI:value::string AS NPI,
+        p.FIRST_NAME:value::string AS FIRST_NAME,
+        p.LAST_NAME:value::string AS LAST_NAME,
+        NULLIF(p.SPECIALTIES[0]:value::string, '') AS SPECIALTIES
+    FROM merged_provider p
+    WHERE p.NPI:value::string IN ({placeholders})
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY p.NPI:value::string
+        ORDER BY NULLIF(p.SPECIALTIES[0]:value::string, '') IS NULL,
+                 NULLIF(p.SPECIALTIES[0]:value::string, ''),
+                 p.LAST_NAME:value::string,
+                 p.FIRST_NAME:value::string
+    ) = 1
+    """
+
+class SnowflakeBackend(ProviderBackend):
+    """merged_provider in Snowflake, over the process's shared connection (see snowflake_session.py)."""
+
+    def __init__(self, credentials_path="credentials.json", max_concurrent_queries=SNOWFLAKE_MAX_CONCURRENT_QUERIES):
+        self.credentials_path = credentials_path
+        self.max_concurrent_queries = max_concurrent_queries
+        self.conn = None
+        self.cs = None
+
+    def _cursor(self):
+        # Connect on the first lookup, so a run answered entirely from the NPI cache needs no SSO login
+        if self.cs is None:
+            self.conn = snowflake_session.get_connection(self.credentials_path)
+            self.cs = self.conn.cursor()
+        return self.cs
+
+    def _results(self, cs, npis):
+        # Result batches arrive as Arrow tables converted straight to DataFrames
+        batches = list(cs.fetch_pandas_batches())
+        df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=RECORD_COLUMNS)
+        return split_results(df[RECORD_COLUMNS], npis)
+
+    def lookup_chunk(self, npis):
+        cs = self._cursor()
+        cs.execute(build_npi_lookup_query(len(npis)), list(npis))
+        run_manifest.count('snowflake_queries')
+        return self._results(cs, npis)
+
+    def lookup_chunks(self, chunks):
+        """
+        Submits the chunk queries asynchronously, keeping up to max_concurrent_queries of them running,
+        and yields each chunk's results as soon as its query finishes (not in submission order).
+        """
+        cs = self._cursor()
+        waiting = list(chunks)
+        running = {}
+        try:
+            while waiting or running:
+                while waiting and len(running) < self.max_concurrent_queries:
+                    chunk = waiting.pop(0)
+                    cs.execute_async(build_npi_lookup_query(len(chunk)), list(chunk))
+                    run_manifest.count('snowflake_queries')
+                    running[cs.sfqid] = chunk
+                finished = [query_id for query_id in running
+                            if not self.conn.is_still_running(self.conn.get_query_status_throw_if_error(query_id))]
+                if not finished:
+                    time.sleep(QUERY_POLL_SECONDS)
+                for query_id in finished:
+                    chunk = running.pop(query_id)
+                    result_cs = self.conn.cursor()
+                    try:
+                        result_cs.get_results_from_sfqid(query_id)
+                        results = self._results(result_cs, chunk)
+                    finally:
+                        result_cs.close()
+                    yield results
+        finally:
+            # Stopped early (a failed query, or the caller gave up): don't leave queries running on the warehouse
+            for query_id in running:
+                try:
+                    cs.execute(f"SELECT SYSTEM$CANCEL_QUERY('{query_id}')")
+                except Exception as e:
+                    print(f"Could not cancel Snowflake query {query_id}: {e}")
+
+    def close(self):
+        # The connection itself stays open for the next lookup in this process
+        if self.cs is not None:
+            self.cs.close()
+        self.conn = None
+        self.cs = None
+
+# The Snowflake projection in SQLite's JSON functions. The fixture gets an index on the NPI expression,
+# so each chunk is an index lookup rather than a scan of the whole table.
+LOCAL_NPI_EXPR = "CAST(json_extract(NPI, '$.value') AS TEXT)"
+LOCAL_SPECIALTY_EXPR = "NULLIF(CAST(json_extract(SPECIALTIES, '$[0].value') AS TEXT), '')"
+
+class LocalBackend(ProviderBackend):
+    """
+    merged_provider rows from fixture_path: a SQLite database with a merged_provider table, or a .csv/.xlsx
+    file loaded into memory. The NPI, FIRST_NAME, LAST_NAME and SPECIALTIES columns hold the VARIANT JSON
+    text Snowflake has (e.g. {"value": "1013105469"} and [{"value": "352"}]).
+    """
+
+    def __init__(self, fixture_path):
+        self.fixture_path = fixture_path
+        if fixture_path.endswith(('.sqlite', '.db')):
+            self.conn = sqlite3.connect(fixture_path, check_same_thread=False)
+        else:
+            if fixture_path.endswith('.csv'):
+                df = pd.read_csv(fixture_path, dtype=str)
+            else:
+                df = pd.read_excel(fixture_path, dtype=str)
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+            df.to_sql('merged_provider', self.conn, index=False)
+        with self.conn:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS merged_provider_npi ON merged_provider ({LOCAL_NPI_EXPR})")
+
+    def lookup_chunk(self, npis):
+        placeholders = ', '.join(['?'] * len(npis))
+        query = f"""
+        SELECT NPI, FIRST_NAME, LAST_NAME, SPECIALTIES FROM (
+            SELECT
+                {LOCAL_NPI_EXPR} AS NPI,
+                CAST(json_extract(FIRST_NAME, '$.value') AS TEXT) AS FIRST_NAME,
+                CAST(json_extract(LAST_NAME, '$.value') AS TEXT) AS LAST_NAME,
+                {LOCAL_SPECIALTY_EXPR} AS SPECIALTIES,
+                -- Same row choice as build_npi_lookup_query
+                ROW_NUMBER() OVER (
+                    PARTITION BY {LOCAL_NPI_EXPR}
+                    ORDER BY {LOCAL_SPECIALTY_EXPR} IS NULL, {LOCAL_SPECIALTY_EXPR},
+                             CAST(json_extract(LAST_NAME, '$.value') AS TEXT),
+                             CAST(json_extract(FIRST_NAME, '$.value') AS TEXT)
+                ) AS npi_rank
+            FROM merged_provider
+            WHERE {LOCAL_NPI_EXPR} IN ({placeholders})
+        ) WHERE npi_rank = 1
+        """
+        df = pd.read_sql_query(query, self.conn, params=list(npis))
+        run_manifest.count('fixture_queries')
+        return split_results(df, npis)
+
+    def close(self):
+        self.conn.close()
+
+def open_backend(fixture_path=None, credentials_path="credentials.json"):
+    """LocalBackend on fixture_path when one is given, otherwise SnowflakeBackend."""
+    if fixture_path:
+        return LocalBackend(fixture_path)
+    return SnowflakeBackend(credentials_path)
@@ -0,0 +1,276 @@
+import asyncio
+import math
+import os
+import statistics
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+import httpx
+import run_manifest
+
+# Async client for the provider-reference service. All requests of a fetch share one connection pool,
+# and timeouts, connection errors and 5xx/429 responses are retried with exponential backoff (or after the
+# Retry-After the service asks for), so the location fetch overlaps its network waits instead of doing
+# one round trip after another. How many requests are on the wire at once, and how many IDs go into each
+# batched request, adapt to what the service takes (AIMD: additive increase, multiplicative decrease).
+
+BASE_PATH = '/provider-reference/v1'
+BASE_URL = 'https://provider-reference-v1.east.zocdoccloud.com' + BASE_PATH
+# Overrides BASE_URL, e.g. to run against mock_provider_reference.py
+BASE_URL_ENV = 'PROVIDER_REFERENCE_URL'
+CLOUD_IDS_PATH = '/practice/ids-by-monolith-ids~batchGet'
+LOCATIONS_PATH = '/practice/location~batchGet'
+HEADERS = {
+    'accept': 'application/json',
+    'Content-Type': 'application/json'
+}
+
+# Requests in flight: start at INITIAL_IN_FLIGHT, never above MAX_IN_FLIGHT (the connection pool size)
+INITIAL_IN_FLIGHT = 8
+MIN_IN_FLIGHT = 1
+MAX_IN_FLIGHT = 32
+# The limit is cut by DECREASE_FACTOR on a 429/5xx/timeout and by SLOWDOWN_FACTOR when a response takes
+# SLOW_RESPONSE_RATIO times the median of the last LATENCY_WINDOW responses
+DECREASE_FACTOR = 0.5
+SLOWDOWN_FACTOR = 0.8
+SLOW_RESPONSE_RATIO = 2.0
+LATENCY_WINDOW = 50
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_RETRIES = 3
+# Waits 1s, 2s, 4s, ... between attempts, unless the response has a Retry-After (capped)
+BACKOFF_SECONDS = 1.0
+MAX_RETRY_AFTER_SECONDS = 120
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def service_url():
+    """The service to talk to: $PROVIDER_REFERENCE_URL when set, otherwise BASE_URL."""
+    return os.environ.get(BASE_URL_ENV) or BASE_URL
+
+def is_transient(response):
+    """Whether a failed response is worth retrying (rate limited or a server-side error)."""
+    return response.status_code in RETRY_STATUSES
+
+def retry_after(response):
+    """Seconds the response's Retry-After header asks to wait (a number or an HTTP date), or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class AdaptiveLimit:
+    """
+    AIMD limit on the requests in flight. It grows by about one per round trip while responses come back
+    fine and shrinks multiplicatively on overload (429, 5xx, timeouts) or slow responses, at most once
+    per median round trip so one burst of failures doesn't collapse it. Also holds every request back
+    until a Retry-After has passed.
+    """
+
+    def __init__(self, initial=INITIAL_IN_FLIGHT, minimum=MIN_IN_FLIGHT, maximum=MAX_IN_FLIGHT):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.initial = self.limit
+        self.lowest = self.highest = self.limit
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.resume_at = 0.0
+        self.last_decrease = 0.0
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+        self.latencies = []
+        self.outcomes = {'ok': 0, 'slow': 0, 'rate_limited': 0, 'failed': 0, 'rejected': 0}
+
+    async def acquire(self):
+        async with self.condition:
+            while self.in_flight >= int(self.limit):
+                await self.condition.wait()
+            self.in_flight += 1
+        while time.monotonic() < self.resume_at:
+            await asyncio.sleep(self.resume_at - time.monotonic())
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        """Sends nothing until seconds from now (the service's Retry-After)."""
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        typical = statistics.median(self.recent) if self.recent else 0
+        if now - self.last_decrease < typical:
+            return
+        self.last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+        self.lowest = min(self.lowest, self.limit)
+
+    def record(self, latency, response):
+        """
+        Adjusts the limit after a request that took latency seconds and got response (None for a
+        timeout/connection error). Returns its outcome: 'ok', 'slow', 'rate_limited', 'failed' or
+        'rejected' (any other 4xx, e.g. a bad token or request, which says nothing about load).
+        """
+        self.latencies.append(latency)
+        if response is None or response.status_code >= 500:
+            outcome = 'failed'
+            self._decrease(DECREASE_FACTOR)
+        elif response.status_code == 429:
+            outcome = 'rate_limited'
+            self._decrease(DECREASE_FACTOR)
+        elif response.status_code >= 400:
+            # Neither grows nor shrinks the limit
+            outcome = 'rejected'
+        else:
+            typical = statistics.median(self.recent) if len(self.recent) >= 10 else None
+            self.recent.append(latency)
+            if typical and latency > SLOW_RESPONSE_RATIO * typical:
+                outcome = 'slow'
+                self._decrease(SLOWDOWN_FACTOR)
+            else:
+                outcome = 'ok'
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.highest = max(self.highest, self.limit)
+        self.outcomes[outcome] += 1
+        return outcome
+
+    def report(self):
+        if not self.latencies:
+            return
+        latencies = ', '.join(f"p{pct} {percentile(self.latencies, pct):.2f}s" for pct in (50, 90, 99))
+        outcomes = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in self.outcomes.items() if count)
+        print(f"provider-reference: {len(self.latencies)} requests ({outcomes}), latency {latencies}; "
+              f"in-flight limit {self.initial:.0f} -> {self.limit:.1f} (range {self.lowest:.1f}-{self.highest:.1f})")
+
+class AdaptiveBatchSize:
+    """
+    IDs per batched request: grows by a tenth of its starting size after each good response, halves when
+    a request fails on the server side or times out (big requests are the likeliest to), and stays put
+    on 429s and slow responses, which the in-flight limit answers, and on other 4xx rejections.
+    """
+
+    def __init__(self, initial, maximum):
+        self.initial = initial
+        self.maximum = max(initial, maximum)
+        self.size = float(initial)
+        self.step = max(1, initial // 10)
+        self.lowest = self.highest = self.size
+
+    def update(self, outcome):
+        if outcome == 'ok':
+            self.size = min(self.maximum, self.size + self.step)
+        elif outcome == 'failed':
+            self.size = max(1.0, self.size / 2)
+        self.lowest = min(self.lowest, self.size)
+        self.highest = max(self.highest, self.size)
+
+    def take(self, ids):
+        """Pops the next batch off the ids deque."""
+        return [ids.popleft() for _ in range(min(int(self.size), len(ids)))]
+
+    def report(self, path):
+        print(f"provider-reference {path.rsplit('/', 1)[-1]}: IDs per request {self.initial} -> {int(self.size)} "
+              f"(range {int(self.lowest)}-{int(self.highest)})")
+
+class ProviderReferenceClient:
+    """Use as 'async with ProviderReferenceClient() as client:' inside one event loop."""
+
+    def __init__(self, base_url=None, max_in_flight=MAX_IN_FLIGHT, timeout=REQUEST_TIMEOUT_SECONDS,
+                 max_retries=MAX_RETRIES, initial_in_flight=INITIAL_IN_FLIGHT):
+        self.base_url = base_url or service_url()
+        self.max_in_flight = max_in_flight
+        self.initial_in_flight = initial_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.client = None
+        self.limit = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        self.client = httpx.AsyncClient(base_url=self.base_url, headers=HEADERS, timeout=self.timeout, limits=limits)
+        self.limit = AdaptiveLimit(self.initial_in_flight, maximum=self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.limit.report()
+
+    async def post(self, path, payload, batch_size=None):
+        """
+        POSTs payload as JSON to path and returns the response. Transient failures are retried; once the
+        retries run out the last response is returned, or the last timeout/connection error raised.
+        batch_size (an AdaptiveBatchSize) is told how each attempt went.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.limit.acquire()
+            start = time.monotonic()
+            response = None
+            try:
+                response = await self.client.post(path, json=payload)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                run_manifest.count('http_requests')
+                outcome = self.limit.record(time.monotonic() - start, response)
+                if batch_size is not None:
+                    batch_size.update(outcome)
+                await self.limit.release()
+            if response is not None and (not is_transient(response) or attempt == self.max_retries):
+                return response
+            run_manifest.count('http_retries')
+            wait_seconds = retry_after(response) if response is not None else None
+            if wait_seconds is not None:
+                self.limit.pause(wait_seconds)
+            else:
+                wait_seconds = BACKOFF_SECONDS * 2 ** attempt
+            await asyncio.sleep(wait_seconds)
+
+    async def post_batched(self, path, field, ids, batch_size, max_batch_size, on_done=None):
+        """
+        POSTs ids as {field: [ids...]} requests, starting at batch_size IDs each and adapting the size (up
+        to max_batch_size) and the number of requests in flight as responses come back. Returns
+        (batch, response) pairs in completion order, with the exception in place of the response for a
+        request that still failed with a timeout/connection error. on_done(batch) is called as each finishes.
+        """
+        remaining = deque(ids)
+        sizer = AdaptiveBatchSize(batch_size, max_batch_size)
+        results = []
+
+        async def post_one(batch):
+            try:
+                result = await self.post(path, {field: batch}, batch_size=sizer)
+            except httpx.TransportError as e:
+                result = e
+            if on_done is not None:
+                on_done(batch)
+            return batch, result
+
+        running = set()
+        while remaining or running:
+            # Each new request takes the batch size and in-flight limit as they are right now
+            while remaining and len(running) < int(self.limit.limit):
+                running.add(asyncio.ensure_future(post_one(sizer.take(remaining))))
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            results.extend(task.result() for task in done)
+        if results:
+            sizer.report(path)
+        return results
+
+def post_batched(path, field, ids, batch_size, max_batch_size, on_done=None, **client_options):
+    """Synchronous ProviderReferenceClient.post_batched over a fresh connection pool."""
+    async def run():
+        async with ProviderReferenceClient(**client_options) as client:
+            return await client.post_batched(path, field, ids, batch_size, max_batch_size, on_done=on_done)
+    return asyncio.run(run())
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import time
+from provider_reference import service_url
+
+# Local cache of provider-reference responses, shared by every run and batch. Cloud IDs are kept per
+# monolith practice ID and locations per practice cloud ID, each with the time it was fetched, so a
+# repeat run for the same practices sends no requests at all. Practices the service doesn't know are
+# stored too (cloud ID NULL) and expire sooner, since new practices get a cloud ID over time.
+# Every entry is keyed on the service URL it came from, so answers from a mock or test service are
+# never returned for the real one.
+
+PROVIDER_REFERENCE_CACHE_FILE = os.path.join("Excel Files", "provider_reference_cache.sqlite")
+CLOUD_ID_TTL_DAYS = 30
+LOCATION_TTL_DAYS = 7
+NOT_FOUND_TTL_DAYS = 1
+
+class ProviderReferenceCache:
+    """
+    Cloud IDs and locations of service (default: provider_reference.service_url()) in the SQLite file at
+    path. The get_* methods return the entries that are cached and younger than their TTL; with
+    refresh=True nothing is read, but fresh responses are still stored.
+    """
+
+    def __init__(self, path=PROVIDER_REFERENCE_CACHE_FILE, cloud_id_ttl_days=CLOUD_ID_TTL_DAYS,
+                 location_ttl_days=LOCATION_TTL_DAYS, not_found_ttl_days=NOT_FOUND_TTL_DAYS, refresh=False,
+                 service=None):
+        self.path = path
+        self.service = service or service_url()
+        self.cloud_id_ttl_seconds = cloud_id_ttl_days * 86400
+        self.location_ttl_seconds = location_ttl_days * 86400
+        self.not_found_ttl_seconds = not_found_ttl_days * 86400
+        self.refresh = refresh
+        self.stats = {kind: {'hits': 0, 'misses': 0, 'expired': 0} for kind in ('cloud_ids', 'locations')}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Batches in other processes may write at the same time; wait for their lock instead of failing
+        self.conn = sqlite3.connect(path, timeout=60)
+        with self.conn:
+            # A cache written before entries were keyed on the service can't tell where they came from
+            for table in ('cloud_ids', 'locations'):
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+                if columns and 'service' not in columns:
+                    self.conn.execute(f"DROP TABLE {table}")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cloud_ids (
+                    service TEXT NOT NULL,
+                    practice_id TEXT NOT NULL,
+                    cloud_id TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (service, practice_id)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS locations (
+                    service TEXT NOT NULL,
+                    cloud_id TEXT NOT NULL,
+                    locations TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (service, cloud_id)
+                )
+            """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _lookup(self, kind, query, keys, ttl_of):
+        stats = self.stats[kind]
+        entries = {}
+        now = time.time()
+        for key in keys:
+            row = None if self.refresh else self.conn.execute(query, (self.service, key)).fetchone()
+            if row is None:
+                stats['misses'] += 1
+                continue
+            value, fetched_at = row
+            if now - fetched_at > ttl_of(value):
+                stats['misses'] += 1
+                stats['expired'] += 1
+                continue
+            stats['hits'] += 1
+            entries[key] = value
+        return entries
+
+    def get_cloud_ids(self, practice_ids):
+        """{practice_id: cloud_id} for the cached practice IDs; cloud_id is None for unknown practices."""
+        return self._lookup(
+            'cloud_ids', "SELECT cloud_id, fetched_at FROM cloud_ids WHERE service = ? AND practice_id = ?",
+            practice_ids,
+            lambda cloud_id: self.cloud_id_ttl_seconds if cloud_id is not None else self.not_found_ttl_seconds)
+
+    def get_locations(self, cloud_ids):
+        """{cloud_id: [location, ...]} for the cached practice cloud IDs."""
+        entries = self._lookup('locations',
+                               "SELECT locations, fetched_at FROM locations WHERE service = ? AND cloud_id = ?",
+                               cloud_ids, lambda locations: self.location_ttl_seconds)
+        return {cloud_id: json.loads(locations) for cloud_id, locations in entries.items()}
+
+    def put_cloud_ids(self, cloud_ids):
+        """Stores {practice_id: cloud_id or None} as fetched now."""
+        fetched_at = time.time()
+        rows = [(self.service, practice_id, None if cloud_id is None else str(cloud_id), fetched_at)
+                for practice_id, cloud_id in cloud_ids.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO cloud_ids VALUES (?, ?, ?, ?)", rows)
+
+    def put_locations(self, locations):
+        """Stores {cloud_id: [location, ...]} (the location~batchGet entries as returned) as fetched now."""
+        fetched_at = time.time()
+        rows = [(self.service, cloud_id, json.dumps(locs, default=str), fetched_at)
+                for cloud_id, locs in locations.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?)", rows)
+
+    def report(self):
+        parts = []
+        for kind, stats in self.stats.items():
+            looked_up = stats['hits'] + stats['misses']
+            rate = f"{stats['hits'] / looked_up:.0%}" if looked_up else "n/a"
+            parts.append(f"{kind.replace('_', ' ')} {stats['hits']}/{looked_up} hits ({rate}, {stats['expired']} expired)")
+        note = " [refresh: cache not read]" if self.refresh else ""
+        print(f"Provider-reference cache ({self.path}): {', '.join(parts)}{note}")
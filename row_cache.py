@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+# Per-row results of the expensive row-by-row steps (provider/location matching), kept from one run to
+# the next. A row is identified by a fingerprint of the fields the step reads from
+# it, and the whole cache belongs to a context fingerprint (the Location table it matched against, the
+# suffix list, the step's own code). When a corrected scope sheet comes back, only rows that are new or
+# changed are recomputed; a changed context starts the step from scratch.
+
+ROW_CACHE_DIR_NAME = ".row_cache"
+
+def _json_default(value):
+    # numpy scalars as the plain Python value, anything else (timestamps, ...) as its text
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _sha256_json(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=_json_default).encode('utf-8')).hexdigest()
+
+def row_fingerprint(*values):
+    """Fingerprint of the given field values of one row (NaN and None count as the same blank)."""
+    return _sha256_json([None if pd.isna(value) else value for value in values])
+
+def table_fingerprint(df):
+    """Content fingerprint of a whole DataFrame, used as (part of) a cache context."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values.tobytes()
+    return hashlib.sha256(repr(list(df.columns)).encode('utf-8') + row_hashes).hexdigest()
+
+def file_fingerprint(path):
+    """Content fingerprint of a file, e.g. the module whose code computes the cached results."""
+    with open(path, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+def cache_dir_for(path):
+    """Row cache folder of the run that writes path (the folder path is in)."""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ROW_CACHE_DIR_NAME)
+
+class RowCache:
+    """
+    Results of one step keyed by row fingerprint, loaded from directory/<name>.json if that file was
+    written for the same context. save() keeps only the rows used in this run, so the file tracks the
+    latest scope sheet instead of growing forever.
+    """
+
+    def __init__(self, directory, name, context):
+        self.path = os.path.join(directory, f"{name}.json")
+        self.name = name
+        self.context = _sha256_json(context)
+        self.previous = {}
+        self.current = {}
+        self.reused = 0
+        self.repeated = 0
+        self.computed = 0
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as fh:
+                    stored = json.load(fh)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable row cache {self.path}: {e}")
+                stored = {}
+            if stored.get('context') == self.context:
+                self.previous = stored.get('rows', {})
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.current or fingerprint in self.previous
+
+    def __getitem__(self, fingerprint):
+        if fingerprint in self.current:
+            return self.current[fingerprint]
+        value = self.previous[fingerprint]
+        self.reused += 1
+        self.current[fingerprint] = value
+        return value
+
+    def put(self, fingerprint, value):
+        """Stores a freshly computed result and returns it as later runs will read it back."""
+        self.computed += 1
+        # Stored as it comes back from JSON, so a cached run sees exactly what a fresh one does
+        value = json.loads(json.dumps(value, default=_json_default))
+        self.current[fingerprint] = value
+        return value
+
+    def get_or_compute(self, fingerprint, compute):
+        """Returns the stored result for fingerprint, or compute() (stored for next time)."""
+        if fingerprint in self.current:
+            # Same fields as an earlier row of this run
+            self.repeated += 1
+            return self.current[fingerprint]
+        if fingerprint in self.previous:
+            return self[fingerprint]
+        return self.put(fingerprint, compute())
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as fh:
+            json.dump({'context': self.context, 'rows': self.current}, fh, default=_json_default)
+        os.replace(self.path + '.tmp', self.path)
+        print(f"{self.name}: {self.reused} rows reused from the previous run, {self.repeated} repeats of an "
+              f"earlier row, {self.computed} computed")
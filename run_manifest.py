@@ -0,0 +1,235 @@
+import datetime
+import json
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.workbook.workbook import Workbook
+
+# Machine-readable record of a run: one entry per stage with wall/CPU time, rows in/out, every workbook
+# load and save (with its size in bytes) and counters such as Snowflake queries and HTTP requests.
+# Nothing is recorded unless a manifest is active (see recording()), so the helpers below can be called
+# from any script whether or not it runs inside the pipeline.
+
+MANIFEST_FILE_NAME = "run_manifest.json"
+
+_active = None
+_lock = threading.Lock()
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def _stream_size(stream):
+    # Size of an open file object without moving its read/write position
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _file_info(target):
+    # (path, size in bytes) for a path or file object handed to openpyxl
+    if isinstance(target, (str, os.PathLike)):
+        path = os.fspath(target)
+        return path, os.path.getsize(path) if os.path.isfile(path) else None
+    return getattr(target, 'name', None), _stream_size(target)
+
+def artifact_rows(value):
+    """Number of data rows in a stage artifact, or None when it is not a table (e.g. a file path)."""
+    from input_table import input_row_count
+    from workbook_session import WorkbookSession
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, WorkbookSession):
+        value = value.wb
+    if isinstance(value, Workbook):
+        ws = value['Provider'] if 'Provider' in value.sheetnames else value.worksheets[0]
+        return max(ws.max_row - 1, 0)
+    if isinstance(value, dict) and all(isinstance(values, list) for values in value.values()):
+        return input_row_count(value)
+    if isinstance(value, tuple) and value and all(isinstance(item, list) for item in value):
+        # Extractors returning several parallel columns, e.g. (lang1_list, lang2_list)
+        return len(value[0])
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+class RunManifest:
+    """
+    Collects the stage records of one run. Stages can be nested; a nested stage is recorded under
+    'parent/child' and its time, workbook I/O and counters are also included in every enclosing stage.
+    I/O and counters go to the stages open on the calling thread. Records are only changed under _lock
+    (see update()), so write() never sees a record that another thread is halfway through changing.
+    """
+
+    def __init__(self, path=None, **info):
+        # With a path the manifest is rewritten after every top-level stage, so a run that is killed
+        # part-way still shows how far it got
+        self.path = path
+        self.info = dict(info)
+        self.info.setdefault('started_at', _now())
+        self.info.setdefault('python', platform.python_version())
+        self.stages = []
+        # Stages run on several threads at once, so each thread keeps its own stack of open stages
+        self._local = threading.local()
+
+    def _open(self):
+        if not hasattr(self._local, 'open'):
+            self._local.open = []
+        return self._local.open
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        open_stages = self._open()
+        qualified = '/'.join([record['name'] for record in open_stages] + [name])
+        record = {
+            'name': qualified,
+            'started_at': _now(),
+            'status': 'running',
+            'wall_seconds': None,
+            'cpu_seconds': None,
+            'rows_in': rows_in,
+            'rows_out': None,
+            'checkpoint': None,
+            'error': None,
+            'workbook_loads': [],
+            'workbook_saves': [],
+            'counters': {},
+        }
+        with _lock:
+            self.stages.append(record)
+        open_stages.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+            self.update(record, status='ok')
+        except BaseException as exc:
+            self.update(record, status='failed', error=f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            # CPU time of the thread running the stage, so stages running side by side don't add up
+            self.update(record, wall_seconds=round(time.perf_counter() - wall_start, 3),
+                        cpu_seconds=round(time.thread_time() - cpu_start, 3))
+            open_stages.remove(record)
+            if self.path and not open_stages:
+                self.write(self.path)
+
+    def update(self, record, **fields):
+        with _lock:
+            record.update(fields)
+
+    def count(self, counter, amount=1):
+        with _lock:
+            for record in self._open():
+                record['counters'][counter] = record['counters'].get(counter, 0) + amount
+
+    def record_io(self, kind, path, size):
+        with _lock:
+            for record in self._open():
+                record[kind].append({'path': path, 'bytes': size})
+
+    def to_dict(self):
+        totals = {}
+        for record in self.stages:
+            if '/' in record['name']:
+                continue
+            for counter, amount in record['counters'].items():
+                totals[counter] = totals.get(counter, 0) + amount
+        return dict(self.info, counter_totals=totals, stages=self.stages)
+
+    def write(self, path):
+        with _lock:
+            with open(path, 'w', encoding='utf-8') as fh:
+                json.dump(self.to_dict(), fh, indent=2, default=str)
+
+def _install_io_hooks(manifest):
+    # Workbook I/O is counted where every load/save ends up, including the ones pandas does internally
+    original_read = ExcelReader.read
+    original_save = Workbook.save
+
+    def read(reader):
+        result = original_read(reader)
+        path, size = _file_info(reader.archive.filename or reader.archive.fp)
+        manifest.record_io('workbook_loads', path, size)
+        return result
+
+    def save(wb, filename):
+        result = original_save(wb, filename)
+        path, size = _file_info(filename)
+        manifest.record_io('workbook_saves', path, size)
+        return result
+
+    ExcelReader.read = read
+    Workbook.save = save
+    return original_read, original_save
+
+def _remove_io_hooks(originals):
+    ExcelReader.read, Workbook.save = originals
+
+@contextmanager
+def recording(path, append=False, **info):
+    """
+    Makes a new manifest the active one for the duration of the block and writes it to path as JSON on
+    exit, also when the block fails. With append=True the stages already in the file at path are kept and
+    the new ones are added after them (used by Report.py, which runs after the pipeline has finished).
+    """
+    global _active
+    manifest = RunManifest(path, **info)
+    if append and os.path.isfile(path):
+        with open(path, encoding='utf-8') as fh:
+            previous = json.load(fh)
+        manifest.stages = previous.get('stages', [])
+        for key, value in previous.items():
+            if key not in ('stages', 'counter_totals'):
+                manifest.info[key] = value
+    manifest.info['status'] = 'running'
+    previous_active = _active
+    originals = _install_io_hooks(manifest)
+    _active = manifest
+    try:
+        yield manifest
+        manifest.info['status'] = 'ok'
+    except BaseException:
+        manifest.info['status'] = 'failed'
+        raise
+    finally:
+        _active = previous_active
+        _remove_io_hooks(originals)
+        manifest.info['finished_at'] = _now()
+        manifest.write(path)
+        print(f"Run manifest written to {path}")
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Times the block as a stage of the active manifest; does nothing when no manifest is recording."""
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, rows_in=rows_in) as record:
+        yield record
+
+def update_stage(record, **fields):
+    """Sets fields (e.g. rows_out) of a record yielded by stage(); use this instead of assigning to it."""
+    if _active is None:
+        record.update(fields)
+    else:
+        _active.update(record, **fields)
+
+def timed_call(name, func, *args, **kwargs):
+    """Calls func as a (sub-)stage called name, with rows_out taken from what it returns."""
+    with stage(name) as record:
+        result = func(*args, **kwargs)
+        update_stage(record, rows_out=artifact_rows(result))
+    return result
+
+def count(counter, amount=1):
+    """Adds amount to a counter (e.g. 'snowflake_queries', 'http_requests') of the running stages."""
+    if _active is not None:
+        _active.count(counter, amount)
@@ -1,68 +1,136 @@
-import os
-import snowflake.connector
+import argparse
+import re
+import sys
+import time
 import pandas as pd
-import numpy as np
-import json
+from api_for_specialty import NPI_CHUNK_SIZE
+from npi_cache import NPI_CACHE_FILE, RECORD_COLUMNS, NpiCache
+from provider_backend import open_backend
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
 
-# Prompt the user for a single NPI number
-npi = input("Enter the NPI number to query: ").strip()
+# NPI lookup console for QA of Mergedoutput.xlsx. NPIs given on the command line or in a file are looked
+# up once; without any it reads NPIs interactively (typed or pasted, any separators). Each lookup answers
+# from the local NPI cache first and sends the misses to Snowflake in chunked queries over one connection
+# kept open for the whole session, so cached NPIs come back in milliseconds.
 
-# Connect to Snowflake using SSO (external browser authentication)
-conn = snowflake.connector.connect(
-    user="dhruv.bhattacharjee@zocdoc.com",
-    account="OLIKNSY-ZOCDOC_001",
-    warehouse="USER_QUERY_WH",
-    database='CISTERN',
-    schema='PROVIDER_PREFILL',  # updated schema
-    role="PROD_OPS_PUNE_ROLE",
-    authenticator='externalbrowser'
-)
+RESULT_COLUMNS = RECORD_COLUMNS + ['STATUS', 'SOURCE']
 
-try:
-    cs = conn.cursor()
-    query = f"""
-    SELECT * FROM merged_provider
-    WHERE NPI:value::string = '{npi}'
-    """
-    cs.execute(query)
-    results = cs.fetchall()
-    columns = [desc[0] for desc in cs.description]
-    if not results:
-        print(f"No results found for NPI: {npi}")
-    else:
-        df = pd.DataFrame(results, columns=columns)
-        # Remove timezone info from all datetime columns
-        for col in df.select_dtypes(include=['datetimetz']).columns:
-            df[col] = df[col].dt.tz_localize(None)
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                if df[col].apply(lambda x: hasattr(x, 'tzinfo') and x.tzinfo is not None).any():
-                    df[col] = df[col].apply(lambda x: x.tz_localize(None) if hasattr(x, 'tzinfo') and x.tzinfo is not None else x)
-        # Select only the required columns
-        selected_columns = ['NPI', 'FIRST_NAME', 'LAST_NAME', 'SPECIALTIES']
-        df_selected = df[selected_columns].copy()
-        # Extract 'value' from JSON strings in each cell, with special handling for SPECIALTIES
-        def extract_value(val, colname):
-            if isinstance(val, str):
-                try:
-                    parsed = json.loads(val)
-                    if colname == 'SPECIALTIES' and isinstance(parsed, list) and len(parsed) > 0:
-                        first = parsed[0]
-                        if isinstance(first, dict) and 'value' in first:
-                            return first['value']
-                    if isinstance(parsed, dict) and 'value' in parsed:
-                        return parsed['value']
-                except Exception:
-                    pass
-            return val
-        for col in selected_columns:
-            df_selected[col] = df_selected[col].apply(lambda x: extract_value(x, col))
-        # Drop rows where SPECIALTIES is blank or null
-        df_selected = df_selected[df_selected['SPECIALTIES'].notnull() & (df_selected['SPECIALTIES'] != '')]
-        # Remove duplicate rows based on NPI and SPECIALTIES
-        df_selected = df_selected.drop_duplicates(subset=['NPI', 'SPECIALTIES'], keep='first')
-        # Print the results to the terminal
-        print(df_selected)
-finally:
-    cs.close()
-    conn.close()
\ No newline at end of file
+HELP = """Enter or paste NPIs (separated by spaces, commas or new lines). Commands:
+  file <path>   look up the NPIs in a .txt/.csv/.xlsx file
+  csv <path>    save the last result as CSV
+  quit          exit (or Ctrl-D / Ctrl-Z)"""
+
+def parse_npis(text):
+    """NPIs in free text: every run of digits."""
+    return re.findall(r'\d+', text)
+
+def read_npi_file(path):
+    """NPIs from a .csv/.xlsx file (its NPI column, else the first column) or a plain text file."""
+    if path.lower().endswith(('.csv', '.xlsx', '.xls')):
+        df = pd.read_csv(path, dtype=str) if path.lower().endswith('.csv') else pd.read_excel(path, dtype=str)
+        column = 'NPI' if 'NPI' in df.columns else df.columns[0]
+        return parse_npis(' '.join(df[column].dropna()))
+    with open(path, encoding='utf-8') as fh:
+        return parse_npis(fh.read())
+
+def lookup(npis, npi_cache, backend):
+    """Looks up npis (cache first, misses in chunks) and returns one result row per distinct NPI."""
+    lookups = {}
+    sources = {}
+    to_query = []
+    for npi in dict.fromkeys(npis):
+        cached = npi_cache.get(npi)
+        if cached is None:
+            to_query.append(npi)
+        else:
+            lookups[npi] = cached
+            sources[npi] = 'cache'
+    if to_query:
+        chunks = [to_query[i:i + NPI_CHUNK_SIZE] for i in range(0, len(to_query), NPI_CHUNK_SIZE)]
+        for results in backend.lookup_chunks(chunks):
+            npi_cache.put_many(results)
+            lookups.update(results)
+            sources.update(dict.fromkeys(results, 'lookup'))
+    rows = []
+    for npi in dict.fromkeys(npis):
+        found, records = lookups[npi]
+        record = records[0] if records else {'NPI': npi}
+        status = 'found' if records else ('no specialty' if found else 'not found')
+        rows.append({**record, 'STATUS': status, 'SOURCE': sources[npi]})
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+def run_lookup(npis, npi_cache, backend):
+    start = time.perf_counter()
+    result = lookup(npis, npi_cache, backend)
+    print(result.to_string(index=False))
+    cached = int((result['SOURCE'] == 'cache').sum())
+    print(f"{len(result)} NPIs: {cached} from the cache, {len(result) - cached} looked up "
+          f"({time.perf_counter() - start:.3f}s)")
+    return result
+
+def save_csv(result, path):
+    result.to_csv(path, index=False)
+    print(f"Saved {len(result)} rows to {path}")
+
+def console(npi_cache, backend):
+    print(HELP)
+    result = None
+    while True:
+        try:
+            line = input("NPI> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        command, _, argument = line.partition(' ')
+        try:
+            if not line:
+                continue
+            if command.lower() in ('quit', 'exit', 'q'):
+                break
+            if command.lower() == 'help':
+                print(HELP)
+            elif command.lower() == 'file':
+                result = run_lookup(read_npi_file(argument.strip().strip('"')), npi_cache, backend)
+            elif command.lower() == 'csv':
+                if result is None:
+                    print("Nothing looked up yet.")
+                else:
+                    save_csv(result, argument.strip().strip('"'))
+            elif parse_npis(line):
+                result = run_lookup(parse_npis(line), npi_cache, backend)
+            else:
+                print(f"Unknown command: {command} (type 'help')")
+        except Exception as e:
+            # A bad file or failed query shouldn't end the session
+            print(f"Error: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up NPIs' name and first specialty, cache first.")
+    parser.add_argument('npis', nargs='*', help="NPIs to look up (omit for the interactive console)")
+    parser.add_argument('--file', help="look up the NPIs in a .txt/.csv/.xlsx file")
+    parser.add_argument('--csv', help="save the results to this CSV file")
+    parser.add_argument('--fixture', help="search a merged_provider fixture instead of Snowflake (not cached)")
+    args = parser.parse_args(argv)
+    npis = parse_npis(' '.join(args.npis))
+    if args.file:
+        npis += read_npi_file(args.file)
+
+    # Fixture results are kept out of the shared cache, in one that lasts only for this session
+    npi_cache = NpiCache(':memory:' if args.fixture else NPI_CACHE_FILE)
+    backend = open_backend(args.fixture)
+    try:
+        if npis:
+            result = run_lookup(npis, npi_cache, backend)
+            if args.csv:
+                save_csv(result, args.csv)
+        else:
+            console(npi_cache, backend)
+    finally:
+        backend.close()
+        npi_cache.report()
+        npi_cache.close()
+
+if __name__ == "__main__":
+    main()
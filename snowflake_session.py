@@ -0,0 +1,57 @@
+import atexit
+import json
+import threading
+import snowflake.connector
+import run_manifest
+
+# One Snowflake connection per process, opened on first use and shared by every lookup after it: the
+# pipeline stages, each batch a worker process runs, singleapisearch.py. SSO logins also carry over
+# between processes: with client_store_temporary_credential the connector keeps the ID token from the
+# browser login in the local credential cache, so later connections reuse it instead of opening the
+# browser again until the token expires (the account must have ALLOW_ID_TOKEN enabled).
+
+SNOWFLAKE_ACCOUNT = "OLIKNSY-ZOCDOC_001"
+SNOWFLAKE_WAREHOUSE = "USER_QUERY_WH"
+SNOWFLAKE_DATABASE = "CISTERN"
+SNOWFLAKE_SCHEMA = "PROVIDER_PREFILL"
+
+_lock = threading.Lock()
+_connection = None
+
+def connect(credentials_path="credentials.json"):
+    """Opens a new SSO connection as the user and role in credentials_path."""
+    # Read user and role from credentials.json instead of hardcoding
+    with open(credentials_path, "r") as cred_file:
+        credentials = json.load(cred_file)
+    # Connect to Snowflake using SSO (external browser authentication)
+    conn = snowflake.connector.connect(
+        user=credentials["user"],
+        account=SNOWFLAKE_ACCOUNT,
+        warehouse=SNOWFLAKE_WAREHOUSE,
+        database=SNOWFLAKE_DATABASE,
+        schema=SNOWFLAKE_SCHEMA,
+        role=credentials["role"],
+        authenticator='externalbrowser',
+        client_store_temporary_credential=True,
+        # Long-lived sessions (an open lookup console) shouldn't expire between queries
+        client_session_keep_alive=True,
+    )
+    run_manifest.count('snowflake_connections')
+    return conn
+
+def get_connection(credentials_path="credentials.json"):
+    """The process's shared connection, (re)opened if there is none yet or it was closed."""
+    global _connection
+    with _lock:
+        if _connection is None or _connection.is_closed():
+            _connection = connect(credentials_path)
+        return _connection
+
+def close_connection():
+    global _connection
+    with _lock:
+        if _connection is not None and not _connection.is_closed():
+            _connection.close()
+        _connection = None
+
+atexit.register(close_connection)
@@ -1,6 +1,5 @@
 import openpyxl
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
+from validation_registry import add_column_dropdown
 import os
 
 def add_specialty_valref_dropdowns(output_file):
@@ -12,12 +11,7 @@ def add_specialty_valref_dropdowns(output_file):
             col_idx = header_row.index(col_name) + 1  # 1-based index for openpyxl
         except ValueError:
             continue  # Skip if the column is not found
-        dv = DataValidation(type="list", formula1='=ValidationAndReference!$K$2:$K$311', allow_blank=True)
-        max_row = ws.max_row
-        col_letter = get_column_letter(col_idx)
-        dv_range = f"{col_letter}2:{col_letter}{max_row}"
-        dv.add(dv_range)
-        ws.add_data_validation(dv)
+        add_column_dropdown(ws, col_idx, '=ValidationAndReference!$K$2:$K$311')
     wb.save(output_file)
 
 if __name__ == "__main__":
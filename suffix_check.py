@@ -2,6 +2,7 @@ import openpyxl
 from openpyxl.styles import PatternFill
 import os
 import re
+from workbook_session import workbook_session
 
 def normalize_suffix(s):
     return re.sub(r'[^a-zA-Z0-9]', '', s or '').lower()
@@ -13,13 +14,13 @@ def get_dropdown_suffixes(template_file):
     suffixes = [s for s in suffixes if s and str(s).strip()]
     return suffixes
 
-def highlight_invalid_suffixes(merged_file, template_file):
+def highlight_invalid_suffixes(session, template_file):
+    """Highlights Professional Suffix 1-3 values missing from the template dropdown (session is not saved here)."""
     yellow_fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
     dropdown_suffixes = get_dropdown_suffixes(template_file)
     norm_dropdown = {normalize_suffix(s) for s in dropdown_suffixes}
 
-    wb = openpyxl.load_workbook(merged_file)
-    ws = wb['Provider']
+    ws = session['Provider']
     header_row = [cell.value for cell in ws[1]]
     max_row = ws.max_row
 
@@ -36,9 +37,9 @@ def highlight_invalid_suffixes(merged_file, template_file):
                 cell.fill = yellow_fill
             else:
                 cell.fill = PatternFill(fill_type=None)
-    wb.save(merged_file)
 
 if __name__ == "__main__":
     merged_file = os.path.join("Excel Files", "Mergedoutput.xlsx")
     template_file = os.path.join("Excel Files", "New Business Scope Sheet - Practice Locations and Providers.xlsx")
-    highlight_invalid_suffixes(merged_file, template_file)
+    with workbook_session(merged_file) as session:
+        highlight_invalid_suffixes(session, template_file)
@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import random
+import string
+import openpyxl
+import pandas as pd
+
+# Synthetic scope sheets for load testing. The columns and value shapes follow the real client inputs
+# (upper-case facility addresses with mixed street-suffix spellings, comma-separated languages and age
+# ranges, pipe-separated appointment types, ...), and the matching Practice-Location and NPI-specialty
+# tables and merged_provider fixture let every stage run offline, without Snowflake or the
+# provider-reference API.
+
+INPUT_COLUMNS = [
+    'Office Key', 'Last Name', 'First Name', 'Practice ID', 'Gender', 'Highest Level of Education', 'License Type',
+    'NPI', 'Insurance', 'School', 'Board Certification', 'Board Subspecialty', 'Ages Treated', 'Languages',
+    'Facility Code', 'Facility Address', 'Facility City', 'Facility Zip', 'Column Heading Name',
+    'Provider Profile Code', 'New Patient Appt Type', 'New Patient Duration', 'Existing Patient Appt Type',
+    'Facility State', 'Existing Patient Duration', 'Telehealth or In-Office or Both', 'Specialties',
+    'Bio/Headshot', 'Headshot URL', 'LicensureLevel', 'ServiceLine Proficiency',
+]
+
+MERGED_PROVIDER_FIXTURE_NAME = "merged_provider.csv"
+MERGED_PROVIDER_COLUMNS = ['NPI', 'FIRST_NAME', 'LAST_NAME', 'SPECIALTIES']
+
+PRACTICE_LOCATION_COLUMNS = [
+    'Practice ID', 'Practice Cloud ID', 'is_virtual', 'Location Type', 'address_1', 'address_2', 'city', 'state',
+    'zip', 'monolith_location_id', 'location_id', 'virtual_visit_type', 'software', 'software_id',
+    'hide_on_profile', 'phone', 'email_addresses',
+]
+
+FIRST_NAMES = ['Rachel', 'Ellie', 'James', 'Maria', 'David', 'Aisha', 'Kevin', 'Laura', 'Miguel', 'Hannah', 'Samuel',
+               'Priya', 'Jordan', 'Grace', 'Thomas', 'Nadia', 'Brian', 'Olivia', 'Marcus', 'Chloe', 'Daniel', 'Fatima']
+LAST_NAMES = ['Fitch', 'Ettman', 'Garcia', 'Nguyen', 'Johnson', 'Patel', "O'Neil", 'Smith-Jones', 'Kowalski', 'Brown',
+              'Martinez', 'Lee', 'Okafor', 'Schmidt', 'Rossi', 'Walker', 'Hernandez', 'McDonald', 'Young', 'Cohen']
+GENDERS = ['Female'] * 15 + ['Male'] * 5 + ['Prefer not to say']
+EDUCATION = ['Master of Social Work (MSW)', 'Master in Counseling (MC)', 'Master of Science in Nursing (MSN)',
+             'Master of Science (MS)', 'Master of Social Work', 'MSW', 'MSN', 'Masters of Arts (MA)',
+             "Master's Degree in Counseling and Psychology", 'Doctor of Psychology (PsyD)', 'Doctor of Medicine (MD)',
+             'Doctor of Social Work (DSW)']
+LICENSE_TYPES = ['LPC', 'MSW, LCSW', 'LCSW', 'PMHNP', 'LSW', 'MSN, APRN, PMHNP-BC', 'DSW, LISW-S, LCSW', 'PMHNP-BC',
+                 'M.D.', 'PsyD', 'LMFT', 'LPCC', 'LMHC', 'Ph.D., Licensed Psychologist', None]
+BOARD_CERTIFICATIONS = [(None, None)] * 8 + [
+    ('American Nurses Credentialing Center', 'Psychiatric - Mental Health Nurse Practitioner'),
+    ('ANCC', 'Psychiatric Mental Health Nurse Practitioner'),
+    ('American Board of Psychiatry & Neurology', 'Psychiatry'),
+]
+AGES_TREATED = ['11-14,15-17,18-21,22-26,27-40,41-64,65+', '18-21,22-26,27-40,41-64,65+',
+                '6-10,11-14,15-17,18-21,22-26,27-40,41-64,65+', '15-17,18-21,22-26,27-40,41-64,65+',
+                '0-5,6-10,11-14,15-17,18-21,22-26,27-40,41-64,65+', '11-14,15-17,18-21,22-26,27-40,41-64',
+                '0-5,6-10,11-14,15-17,18-21,22-26', '22-26,27-40,41-64,65+']
+LANGUAGES = ['English'] * 12 + ['English,Spanish'] * 2 + ['English,Hmong', 'English,Sign', 'English,Haitian Creole',
+                                                          'English,Chinese,Mandarin', 'Spanish,English', 'English,Hindi,Urdu']
+VISIT_MODES = ['Both'] * 17 + ['Telehealth'] * 2 + ['In-Office']
+SPECIALTIES = ['Anxiety', 'Depression', 'PTSD/Trauma', 'ADHD', 'Grief', "Women's Issues", 'Bipolar Disorder',
+               'Midlife Transitions', 'Childhood Behavior Issues', 'Obsessive-Compulsive Disorder',
+               'Alcohol and Drug Use Issues', 'Gender Identity', "Couple's Issues", 'Sleep Disorders/Insomnia',
+               'Eating Disorders']
+SPECIALTY_IDS = [160, 8, 153, 388, 130]
+SCHOOLS = ['Troy University', 'University of Alabama', 'Capella University', 'Walden University',
+           'University of Kentucky', 'Arcadia University', 'Ohio State University', 'University of Texas']
+INSURANCE = ['Aetna-Commercial', 'Aetna-Medicare', 'Carelon (Beacon)-Commercial', 'Cigna-Commercial',
+             'UnitedHealthcare-Commercial', 'Optum-Medicare', 'Humana-Medicare', 'Blue Cross Blue Shield-Commercial']
+APPT_TYPES = ['THER IA ADULT', 'TELE THER IA', 'COUPLES THER IA', 'EAP THER IA CHILD', 'TELE COUPLES THER IA',
+              'MED MGMT IA']
+
+# City, state and the first three ZIP digits
+CITIES = [('MILFORD', 'OH', '451'), ('PLYMOUTH MEETING', 'PA', '194'), ('SAVANNAH', 'GA', '314'),
+          ('AUSTIN', 'TX', '787'), ('HOUSTON', 'TX', '770'), ('NAPERVILLE', 'IL', '605'), ('CHICAGO', 'IL', '606'),
+          ('SAN DIEGO', 'CA', '921'), ('SACRAMENTO', 'CA', '958'), ('ATLANTA', 'GA', '303'), ('COLUMBUS', 'OH', '432'),
+          ('ANN ARBOR', 'MI', '481'), ('SALT LAKE CITY', 'UT', '841'), ('TAMPA', 'FL', '336'), ('ALBANY', 'NY', '122'),
+          ('WORCESTER', 'MA', '016'), ('DENVER', 'CO', '802'), ('EDINA', 'MN', '554')]
+STREETS = ['STATE ROUTE 28', 'W GERMANTOWN', 'PAULSEN', 'MAIN', 'OAK', 'LAKEVIEW', 'N CAPITAL OF TEXAS', 'WASHINGTON',
+           'PEACHTREE', 'MAPLE', 'SPRING CREEK', 'E 5TH', 'RIVERSIDE', 'HIGHLAND', 'PARK', 'CENTRE', 'SW MARKET']
+# (input spelling, spelling used by the provider-reference data), so suffix normalisation has work to do
+SUFFIXES = [('ST', 'St'), ('STREET', 'St'), ('AVE', 'Ave'), ('AVENUE', 'Ave'), ('RD', 'Rd'), ('BLVD', 'Blvd'),
+            ('PIKE', 'Pike'), ('DR', 'Dr'), ('DRIVE', 'Dr'), ('PKWY', 'Pkwy'), ('HWY', 'Hwy'), ('LN', 'Ln'),
+            ('CT', 'Ct'), ('WAY', 'Way')]
+SOFTWARE = [('AdvancedMD', 328), ('Athena', 12), ('eClinicalWorks', 51)]
+
+def _random_id(rng, prefix):
+    return prefix + ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(22))
+
+def _bio(rng, first, last, license_type):
+    # Real bios run 1300-2500 characters, so some cross the 2000-character limit the report flags
+    sentence = (f"{first} {last}, {license_type or 'LPC'}, helps individuals and families work through "
+                f"{rng.choice(SPECIALTIES).lower()} and {rng.choice(SPECIALTIES).lower()}. ")
+    return (sentence * (rng.randint(1300, 2500) // len(sentence) + 1))[:rng.randint(1300, 2500)]
+
+def _facilities(rng, count):
+    facilities = []
+    practice_ids = {}
+    for idx in range(count):
+        city, state, zip3 = rng.choice(CITIES)
+        suffix_in, suffix_ref = rng.choice(SUFFIXES)
+        street = rng.choice(STREETS)
+        number = rng.randint(10, 9999)
+        suite = f"STE {rng.randint(100, 450)}" if rng.random() < 0.6 else None
+        # One practice per state, like the real batches
+        practice_ids.setdefault(state, rng.randint(10000, 69999))
+        facilities.append({
+            'code': ''.join(rng.choice(string.ascii_uppercase) for _ in range(5)),
+            'address': f"{number} {street} {suffix_in}" + (f" {suite}" if suite else ""),
+            'address_1_ref': f"{number} {street.title()} {suffix_ref}",
+            'address_2_ref': suite.title() if suite else None,
+            'city': city,
+            'state': state,
+            'zip': f"{zip3}{rng.randint(0, 99):02d}",
+            'zip4': rng.randint(1000, 9999),
+            'practice_id': practice_ids[state],
+        })
+    return facilities
+
+def generate_scope_sheet(rows, seed=0):
+    """
+    Returns (input_df, practice_location_df, npi_specialty_df) for a synthetic batch of rows providers:
+    the scope sheet itself, the Practice-Location table api_for_location.py would build for it and the
+    NPI specialties api_for_specialty.py would return.
+    """
+    rng = random.Random(seed)
+    facilities = _facilities(rng, max(5, rows // 8))
+    input_rows = []
+    specialty_rows = []
+    npis = []
+    for idx in range(rows):
+        facility = rng.choice(facilities)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        # About 1% repeat an earlier NPI, which the merge step highlights as duplicates
+        npi = rng.choice(npis) if npis and rng.random() < 0.01 else 1000000000 + rng.randint(0, 899999999)
+        npis.append(npi)
+        license_type = rng.choice(LICENSE_TYPES)
+        board_certification, board_subspecialty = rng.choice(BOARD_CERTIFICATIONS)
+        appt_count = rng.randint(2, 6)
+        input_rows.append({
+            'Office Key': 140000 + idx,
+            'Last Name': last,
+            'First Name': first,
+            'Practice ID': facility['practice_id'],
+            'Gender': rng.choice(GENDERS),
+            'Highest Level of Education': rng.choice(EDUCATION),
+            'License Type': license_type,
+            'NPI': npi,
+            'Insurance': '|'.join(f"{plan}(2025-11-04-)" for plan in rng.sample(INSURANCE, rng.randint(1, 5))),
+            'School': rng.choice(SCHOOLS),
+            'Board Certification': board_certification,
+            'Board Subspecialty': board_subspecialty,
+            'Ages Treated': rng.choice(AGES_TREATED),
+            'Languages': rng.choice(LANGUAGES),
+            'Facility Code': facility['code'],
+            'Facility Address': facility['address'],
+            'Facility City': facility['city'],
+            'Facility Zip': f"{facility['zip']}-{facility['zip4']}",
+            'Column Heading Name': f"{last.upper()}-{facility['code']}",
+            'Provider Profile Code': (last[:3] + first[:3]).upper(),
+            'New Patient Appt Type': '|'.join(rng.choice(APPT_TYPES) for _ in range(appt_count)),
+            'New Patient Duration': '|'.join(['60'] * appt_count),
+            'Existing Patient Appt Type': '|'.join(rng.choice(APPT_TYPES).replace(' IA', ' F/U') for _ in range(appt_count)),
+            'Facility State': facility['state'],
+            'Existing Patient Duration': '|'.join(['60'] * appt_count),
+            'Telehealth or In-Office or Both': rng.choice(VISIT_MODES),
+            'Specialties': ','.join(sorted(rng.sample(SPECIALTIES, rng.randint(3, 10)))),
+            'Bio/Headshot': _bio(rng, first, last, license_type),
+            'Headshot URL': f"https://prod-clinicians-photo.s3.amazonaws.com/{npi}.jpg",
+            'LicensureLevel': 'Full' if rng.random() < 0.8 else 'Provisional',
+            'ServiceLine Proficiency': f"Individual Therapy | {rng.choice(AGES_TREATED)} | "
+                                       + ' , '.join(rng.sample(SPECIALTIES, 4)),
+        })
+        # Most NPIs have a specialty in Snowflake, some aren't found
+        if rng.random() < 0.9:
+            specialty_rows.append({'NPI': npi, 'FIRST_NAME': 'F', 'LAST_NAME': 'L',
+                                   'SPECIALTIES': float(rng.choice(SPECIALTY_IDS))})
+
+    location_rows = []
+    practice_cloud_ids = {}
+    for facility in facilities:
+        practice_id = facility['practice_id']
+        practice_cloud_ids.setdefault(practice_id, _random_id(rng, 'pt_'))
+        # A few facilities are missing from provider-reference, so some providers stay unmatched
+        if rng.random() < 0.05:
+            continue
+        software, software_id = rng.choice(SOFTWARE)
+        for is_virtual in (False, True):
+            location_rows.append({
+                'Practice ID': str(practice_id),
+                'Practice Cloud ID': practice_cloud_ids[practice_id],
+                'is_virtual': is_virtual,
+                'Location Type': 'Virtual' if is_virtual else 'In Person',
+                'address_1': facility['address_1_ref'],
+                'address_2': facility['address_2_ref'],
+                'city': facility['city'].title(),
+                'state': facility['state'],
+                'zip': facility['zip'],
+                'monolith_location_id': rng.randint(100000, 999999),
+                'location_id': _random_id(rng, 'lo_'),
+                'virtual_visit_type': 'ThirdPartyVideoVisit' if is_virtual else None,
+                'software': software,
+                'software_id': software_id,
+                'hide_on_profile': False,
+                'phone': ''.join(rng.choice(string.digits) for _ in range(10)),
+                'email_addresses': f"office{rng.randint(1, 99)}@example.com",
+            })
+    return (pd.DataFrame(input_rows, columns=INPUT_COLUMNS),
+            pd.DataFrame(location_rows, columns=PRACTICE_LOCATION_COLUMNS),
+            pd.DataFrame(specialty_rows, columns=['NPI', 'FIRST_NAME', 'LAST_NAME', 'SPECIALTIES']))
+
+def generate_merged_provider(input_df, npi_specialty_df, seed=0):
+    """
+    merged_provider rows for a provider_backend.LocalBackend fixture, with the VARIANT columns as JSON
+    text: every NPI of npi_specialty_df with its specialty, some of the batch's other NPIs without any
+    and as many unrelated providers again, so lookups search a table bigger than the batch.
+    """
+    rng = random.Random(seed)
+    names = {npi: (first, last) for npi, first, last in zip(input_df['NPI'], input_df['First Name'], input_df['Last Name'])}
+
+    def provider_row(npi, specialty_ids):
+        first, last = names.get(npi) or (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+        return {'NPI': json.dumps({'value': str(npi)}), 'FIRST_NAME': json.dumps({'value': first.upper()}),
+                'LAST_NAME': json.dumps({'value': last.upper()}),
+                'SPECIALTIES': json.dumps([{'value': str(specialty_id)} for specialty_id in specialty_ids])}
+
+    rows = []
+    with_specialty = set()
+    for npi, specialty in zip(npi_specialty_df['NPI'], npi_specialty_df['SPECIALTIES']):
+        # Some providers also have a row without specialties, which the lookup has to pass over
+        if rng.random() < 0.2:
+            rows.append(provider_row(npi, []))
+        rows.append(provider_row(npi, [int(specialty)] + rng.sample(SPECIALTY_IDS, rng.randint(0, 2))))
+        with_specialty.add(npi)
+    for npi in dict.fromkeys(input_df['NPI']):
+        if npi not in with_specialty and rng.random() < 0.5:
+            rows.append(provider_row(npi, []))
+    for _ in range(len(input_df)):
+        npi = 1000000000 + rng.randint(0, 899999999)
+        if npi not in names:
+            rows.append(provider_row(npi, [rng.choice(SPECIALTY_IDS)]))
+    rng.shuffle(rows)
+    return pd.DataFrame(rows, columns=MERGED_PROVIDER_COLUMNS)
+
+def write_table(df, path, sheet_name):
+    """Writes df to a one-sheet workbook (write-only mode, so 100k-row sheets stay fast)."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append([None if pd.isna(value) else value for value in row])
+    wb.save(path)
+    return path
+
+def write_scope_sheet(rows, out_dir, seed=0):
+    """
+    Generates a batch of rows providers into out_dir: Input.xlsx plus Practice-Location.xlsx,
+    Npi-specialty.xlsx and the merged_provider fixture. Returns (input_path, practice_location_df,
+    npi_specialty_df).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    input_df, practice_location_df, npi_specialty_df = generate_scope_sheet(rows, seed=seed)
+    input_path = write_table(input_df, os.path.join(out_dir, "Input.xlsx"), 'Sheet1')
+    write_table(practice_location_df, os.path.join(out_dir, "Practice-Location.xlsx"), 'Sheet1')
+    write_table(npi_specialty_df, os.path.join(out_dir, "Npi-specialty.xlsx"), 'Sheet1')
+    generate_merged_provider(input_df, npi_specialty_df, seed=seed).to_csv(
+        os.path.join(out_dir, MERGED_PROVIDER_FIXTURE_NAME), index=False)
+    return input_path, practice_location_df, npi_specialty_df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic scope sheet with matching reference data.")
+    parser.add_argument('rows', type=int, help="number of provider rows")
+    parser.add_argument('--out', default=os.path.join("Excel Files", "synthetic"), help="output folder")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    path, _, _ = write_scope_sheet(args.rows, args.out, seed=args.seed)
+    print(f"Wrote {args.rows} rows to {path}")
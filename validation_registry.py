@@ -0,0 +1,108 @@
+from collections import defaultdict
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+from openpyxl.worksheet.datavalidation import DataValidation
+
+# Every dropdown in the workbooks goes through this module. The worksheet's own validation list is the
+# registry: a declaration whose rule (type, source formula, flags) is already on the sheet adds its range
+# to that DataValidation instead of stacking another one, so each sheet carries one validation per formula.
+# A declaration also takes its cells away from the other list validations on the sheet, so the latest
+# dropdown declared for a cell is the only one it has.
+
+def _rule_key(dv):
+    # Everything except the ranges decides whether two validations can share one <dataValidation>
+    attrs = tuple(getattr(dv, name) for name in dv.__attrs__ if name != 'sqref')
+    return attrs + (dv.formula1, dv.formula2)
+
+def _column_spans(ranges):
+    # {column: ((min_row, max_row), ...)} with overlapping or touching rows merged, for the cells in ranges
+    rows_by_col = defaultdict(list)
+    for cell_range in ranges:
+        cell_range = CellRange(str(cell_range))
+        for col in range(cell_range.min_col, cell_range.max_col + 1):
+            rows_by_col[col].append((cell_range.min_row, cell_range.max_row))
+    spans_by_col = {}
+    for col, spans in rows_by_col.items():
+        merged = []
+        for min_row, max_row in sorted(spans):
+            if merged and min_row <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], max_row)
+            else:
+                merged.append([min_row, max_row])
+        spans_by_col[col] = tuple(tuple(span) for span in merged)
+    return spans_by_col
+
+def merge_ranges(ranges):
+    """
+    Returns a MultiCellRange covering the same cells as ranges, with duplicates dropped, overlapping or
+    touching rows merged per column and neighbouring columns with the same rows joined into one block.
+    """
+    return _ranges_from_spans(_column_spans(ranges))
+
+def subtract_ranges(ranges, removed):
+    """Returns a MultiCellRange covering the cells of ranges that are not in removed, merged like merge_ranges()."""
+    spans_by_col = _column_spans(ranges)
+    for col, removed_spans in _column_spans(removed).items():
+        spans = spans_by_col.get(col, ())
+        for cut_min, cut_max in removed_spans:
+            kept = []
+            for min_row, max_row in spans:
+                if min_row < cut_min:
+                    kept.append((min_row, min(max_row, cut_min - 1)))
+                if max_row > cut_max:
+                    kept.append((max(min_row, cut_max + 1), max_row))
+            spans = tuple(kept)
+        if spans:
+            spans_by_col[col] = spans
+        else:
+            spans_by_col.pop(col, None)
+    return _ranges_from_spans(spans_by_col)
+
+def _ranges_from_spans(spans_by_col):
+    blocks = []
+    start_col = prev_col = None
+    for col in sorted(spans_by_col):
+        if start_col is not None and col == prev_col + 1 and spans_by_col[col] == spans_by_col[start_col]:
+            prev_col = col
+            continue
+        if start_col is not None:
+            blocks.append((start_col, prev_col, spans_by_col[start_col]))
+        start_col = prev_col = col
+    if start_col is not None:
+        blocks.append((start_col, prev_col, spans_by_col[start_col]))
+    merged_ranges = MultiCellRange()
+    for min_col, max_col, spans in blocks:
+        for min_row, max_row in spans:
+            merged_ranges.add(CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row))
+    return merged_ranges
+
+def add_list_validation(ws, formula, cell_range, allow_blank=True):
+    """
+    Declares a list dropdown with source formula for cell_range (e.g. 'C2:C100') on ws and returns the
+    DataValidation now holding it. A validation with the same rule already on the sheet is reused; any
+    other list dropdown declared earlier for some of these cells no longer covers them.
+    """
+    new_dv = DataValidation(type="list", formula1=formula, allow_blank=allow_blank)
+    key = _rule_key(new_dv)
+    for dv in list(ws.data_validations.dataValidation):
+        if dv.type != "list" or _rule_key(dv) == key:
+            continue
+        remaining = subtract_ranges(dv.sqref.ranges, [cell_range])
+        if not remaining.ranges:
+            ws.data_validations.dataValidation.remove(dv)
+        else:
+            dv.sqref = remaining
+    for dv in ws.data_validations.dataValidation:
+        if _rule_key(dv) == key:
+            dv.sqref = merge_ranges(list(dv.sqref.ranges) + [cell_range])
+            return dv
+    new_dv.sqref = merge_ranges([cell_range])
+    ws.add_data_validation(new_dv)
+    return new_dv
+
+def add_column_dropdown(ws, col_idx, formula, first_row=2, last_row=None, allow_blank=True):
+    """Declares a list dropdown for column col_idx (1-based) from first_row down to last_row (default ws.max_row)."""
+    col_letter = get_column_letter(col_idx)
+    if last_row is None:
+        last_row = ws.max_row
+    return add_list_validation(ws, formula, f"{col_letter}{first_row}:{col_letter}{last_row}", allow_blank=allow_blank)
@@ -0,0 +1,147 @@
+import datetime
+import math
+from contextlib import contextmanager
+import numpy as np
+import openpyxl
+import pandas as pd
+from pandas.io.excel._openpyxl import OpenpyxlWriter
+from pandas.io.formats.excel import ExcelFormatter
+from pandas.io.parsers import TextParser
+
+def stored_value(value):
+    """
+    The value a cell would hold after saving and re-loading the workbook:
+    empty strings, NaN and infinite numbers are not kept by openpyxl and come back as None,
+    and numbers are stored as '%.16g' text (so 5.0 comes back as the int 5).
+    """
+    if isinstance(value, str):
+        return value if value != '' else None
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.integer, np.floating)):
+        return value
+    if not math.isfinite(value):
+        return None
+    stored = "%.16g" % value
+    if '.' in stored or 'e' in stored or 'E' in stored:
+        return float(stored)
+    return int(stored)
+
+def cached_value(cell):
+    """
+    The value load_workbook(..., data_only=True) would return for the saved cell.
+    openpyxl does not calculate formulas, so formula cells have no cached result.
+    """
+    if cell.data_type == 'f':
+        return None
+    return stored_value(cell.value)
+
+def _pandas_cell_value(cell):
+    # Same conversion pandas' openpyxl reader applies to the saved cell
+    value = cached_value(cell)
+    if value is None:
+        return ""
+    if cell.data_type == 'e':
+        return np.nan
+    if cell.data_type == 'n' and not isinstance(value, bool):
+        as_int = int(value)
+        if as_int == value:
+            return as_int
+        return float(value)
+    return value
+
+def _excel_value(value):
+    # Same conversion pandas.ExcelWriter applies before handing a value to openpyxl
+    number_format = None
+    if isinstance(value, (bool, np.bool_)):
+        value = bool(value)
+    elif isinstance(value, (int, np.integer)):
+        value = int(value)
+    elif isinstance(value, (float, np.floating)):
+        value = float(value)
+    elif isinstance(value, datetime.datetime):
+        number_format = 'YYYY-MM-DD HH:MM:SS'
+    elif isinstance(value, datetime.date):
+        number_format = 'YYYY-MM-DD'
+    elif isinstance(value, datetime.timedelta):
+        value = value.total_seconds() / 86400
+        number_format = '0'
+    else:
+        value = str(value)
+    return stored_value(value), number_format
+
+class WorkbookSession:
+    """
+    One in-memory copy of a workbook shared by every post-processing step, saved once at the end.
+    read_dataframe/write_dataframe behave like pd.read_excel and pd.ExcelWriter(mode='a') on the
+    saved file, so steps written against pandas and steps written against openpyxl can be mixed.
+    Pass wb to wrap a workbook built in memory that will be saved to path, instead of loading path.
+    """
+
+    def __init__(self, path, wb=None):
+        self.path = path
+        self.wb = wb if wb is not None else openpyxl.load_workbook(path)
+
+    def __getitem__(self, sheet_name):
+        return self.wb[sheet_name]
+
+    @property
+    def sheetnames(self):
+        return self.wb.sheetnames
+
+    def read_dataframe(self, sheet_name):
+        """Returns the sheet as pd.read_excel(path, sheet_name=sheet_name) would after a save."""
+        ws = self.wb[sheet_name]
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(ws.iter_rows()):
+            converted_row = [_pandas_cell_value(cell) for cell in row]
+            while converted_row and converted_row[-1] == "":
+                converted_row.pop()
+            if converted_row:
+                last_row_with_data = row_number
+            data.append(converted_row)
+        data = data[:last_row_with_data + 1]
+        if not data:
+            return pd.DataFrame()
+        max_width = max(len(data_row) for data_row in data)
+        data = [data_row + [""] * (max_width - len(data_row)) for data_row in data]
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+
+    def write_dataframe(self, sheet_name, df, overlay=False):
+        """
+        Writes df (header row plus values, no index) to the sheet like df.to_excel does through
+        pd.ExcelWriter(mode='a'): if_sheet_exists='replace' by default, 'overlay' when overlay=True.
+        """
+        if sheet_name in self.wb.sheetnames and overlay:
+            ws = self.wb[sheet_name]
+        elif sheet_name in self.wb.sheetnames:
+            target_index = self.wb.sheetnames.index(sheet_name)
+            del self.wb[sheet_name]
+            ws = self.wb.create_sheet(sheet_name, target_index)
+        else:
+            ws = self.wb.create_sheet(sheet_name)
+        for excel_cell in ExcelFormatter(df, index=False).get_formatted_cells():
+            cell = ws.cell(row=excel_cell.row + 1, column=excel_cell.col + 1)
+            cell.value, number_format = _excel_value(excel_cell.val)
+            if number_format:
+                cell.number_format = number_format
+            if excel_cell.style:
+                for attr, style in OpenpyxlWriter._convert_to_style_kwargs(excel_cell.style).items():
+                    setattr(cell, attr, style)
+        return ws
+
+    def save(self, path=None):
+        """Writes the workbook to path (default: the file it was loaded from)."""
+        self.wb.save(path or self.path)
+
+@contextmanager
+def workbook_session(source):
+    """
+    Yields a WorkbookSession for source. When source is a path the session is opened here and
+    the workbook is saved on exit; an existing session is passed through and left unsaved.
+    """
+    if isinstance(source, WorkbookSession):
+        yield source
+        return
+    session = WorkbookSession(source)
+    yield session
+    session.save()